@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de text_cleaning contre l'ancienne chaine de re.sub.
+Corpus: les textes de hyy-data.json, tels quels et habilles d'un en-tete et
+de pieds de page comme sur les pages scrapees. Verifie aussi que les deux
+versions donnent exactement le meme resultat.
+
+python bench_clean.py [repetitions]
+"""
+
+import sys
+import json
+import re
+import time
+from pathlib import Path
+
+from text_cleaning import clean_and_classify
+
+DATA_FILE = Path(__file__).resolve().parent / "hyy-data.json"
+
+HEADER = "Calendrier juif\nEtudes\nChapitre du jour\nAujourd'hui\n\n"
+FOOTERS = [
+    "",
+    "\nJeudi 5 mars 2026 / 16 adar 5786\nAujourd'hui\nDemain\nTéléchargez le calendrier",
+    "\nAu sujet de l'éditeur\nKehot Publication Society\nAcheter le livre\nVoir le site",
+    "\n\nRestez connecté avec le meilleur de Chabad.org\nS'abonner",
+    "\nLessons In Tanya, Kehot Publication Society.",
+]
+
+
+def legacy_clean(text):
+    """_clean_scraped_text before text_cleaning (reference)."""
+    if not text:
+        return text
+    text = re.sub(r'^Calendrier juif[\s\S]*?Aujourd.hui\s*\n', '', text)
+    text = re.sub(r'\n[A-Za-zÀ-ÿ]+ \d+ [A-Za-zÀ-ÿ]+ \d{4} / \d+ [a-zà-ÿ]+ \d{4}\nAujourd.hui[\s\S]*$', '', text)
+    text = re.sub(r'\nTéléchargez le calendrier[\s\S]*$', '', text)
+    text = re.sub(r'\nAbout the book[\s\S]*$', '', text)
+    text = re.sub(r'\nCette page comporte des textes sacrés[\s\S]*$', '', text)
+    text = re.sub(r'\nEtudes quotidiennes[\s\S]*$', '', text)
+    text = re.sub(r'\nAu sujet de l.éditeur[\s\S]*$', '', text)
+    text = re.sub(r'Lessons In Tanya[\s\S]{0,200}$', '', text)
+    text = re.sub(r'forthcoming English Chumash[\s\S]{0,200}$', '', text)
+    text = re.sub(r'Chabad House Publications[\s\S]{0,200}$', '', text)
+    text = re.sub(r"Plus d'options d'abonnement[\s\S]{0,200}$", '', text)
+    text = re.sub(r"S'abonner[\s\S]{0,100}$", '', text)
+    text = re.sub(r"Restez connecté[\s\S]{0,200}$", '', text)
+    text = re.sub(r"Chaque semaine, dans votre boîte mail[\s\S]{0,200}$", '', text)
+    text = re.sub(r'Kehot Publication Society[\s\S]{0,200}$', '', text)
+    return text.strip()
+
+
+def legacy_garbage(text):
+    """_is_garbage_text before text_cleaning (reference)."""
+    if not text or len(text) < 50:
+        return True
+    for g in ["email_placeholder", "Nous ne communiquerons pas votre adresse"]:
+        if g in text and len(text) < 300:
+            return True
+    for g in ["Restez connecté avec le meilleur de Chabad.org", "Chaque semaine, dans votre boîte mail"]:
+        if g in text:
+            return True
+    if len(text) < 300:
+        for g in ["S'abonner", "Plus d'options d'abonnement"]:
+            if g in text:
+                return True
+    footer_markers = ["Au sujet de l'éditeur", "Acheter le livre", "Voir le site", "Kehot Publication Society"]
+    if sum(1 for m in footer_markers if m in text) >= 2 and len(text) < 300:
+        return True
+    return False
+
+
+def legacy(text):
+    cleaned = legacy_clean(text)
+    return cleaned, legacy_garbage(cleaned)
+
+
+def corpus():
+    with open(DATA_FILE, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    texts = []
+    for section, entries in data.items():
+        for value in entries.values():
+            text = value.get("text", "") if isinstance(value, dict) else value
+            texts.append(text)
+            for footer in FOOTERS:
+                texts.append(HEADER + text + footer)
+                texts.append(text[:120] + footer)  # short page: garbage rules apply
+    return texts
+
+
+def bench(fn, texts, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for text in texts:
+            fn(text)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    texts = corpus()
+    diff = [t for t in texts if legacy(t) != clean_and_classify(t)]
+    total = sum(len(t) for t in texts)
+    print("Corpus: %d texts, %.1f KB" % (len(texts), total / 1024))
+    if diff:
+        print("x %d texts differ, first: %r" % (len(diff), diff[0][:200]))
+        sys.exit(1)
+    old = bench(legacy, texts, repeat)
+    new = bench(clean_and_classify, texts, repeat)
+    print("legacy re.sub chain: %7.2f ms" % (old * 1000))
+    print("single scan:         %7.2f ms" % (new * 1000))
+    print("speedup:             %7.2fx" % (old / new))
+
+
+if __name__ == "__main__":
+    main()
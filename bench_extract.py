@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Latence parse + extraction de extract_text_bs, avant/apres.
+- avant: html.parser, get_text + find_all('a') par bloc candidat
+- apres: HTML_PARSER (lxml si installe) + block_index en une passe
+Pages: celles d'une archive (--archive DIR de scrape_daily_studies.py) ou,
+a defaut, des pages synthetiques profondes facon fr.chabad.org.
+Verifie que l'ancien et le nouvel algorithme donnent le meme texte.
+
+python bench_extract.py [ARCHIVE_DIR]
+"""
+
+import sys
+import gzip
+import json
+import time
+from pathlib import Path
+
+import html_extract
+from html_extract import make_soup, _bs_text, _extract, _BLOCK_SKIP_RE
+from text_cleaning import RULES, strip_boilerplate, is_nav_text, is_boilerplate, latin_ratio, accepts, study_tiers
+
+
+def legacy_extract(soup, keep_lines=True, study=None):
+    """extract_text_bs before block_index (reference)."""
+    for tag in soup.find_all(RULES['remove_tags']):
+        tag.decompose()
+    for _name, tier in study_tiers(study):
+        for sel in tier['selectors']:
+            el = soup.select_one(sel)
+            if el:
+                text = _bs_text(el, keep_lines)
+                if accepts(tier, text):
+                    return strip_boilerplate(text)
+    blocks = RULES['blocks']
+    best_fr, best_fr_len, best_any, best_any_len = None, 0, None, 0
+    for div in soup.find_all(blocks['tags']):
+        attrs = ' '.join(div.get('class', [])) + ' ' + (div.get('id') or '')
+        if _BLOCK_SKIP_RE.search(attrs.lower()): continue
+        txt = div.get_text(strip=True)
+        if not blocks['min_len'] < len(txt) < blocks['max_len']: continue
+        link_text = sum(len(a.get_text(strip=True)) for a in div.find_all('a'))
+        if link_text / len(txt) > blocks['max_link_ratio']: continue
+        if is_nav_text(txt) or is_boilerplate(txt): continue
+        if len(txt) > best_any_len:
+            best_any, best_any_len = div, len(txt)
+        if len(txt) > best_fr_len and latin_ratio(txt) > blocks['latin_min']:
+            best_fr, best_fr_len = div, len(txt)
+    best = best_fr or best_any
+    if best:
+        return strip_boilerplate(_bs_text(best, keep_lines))
+    return None
+
+
+def synthetic_pages(n=40, depth=30):
+    """Deep pages without a known content selector: the largest-block search decides."""
+    nav = '<ul class="menu">' + ''.join('<li><a href="/p%d">Lien %d</a></li>' % (i, i) for i in range(150)) + '</ul>'
+    pages = []
+    for i in range(n):
+        para = ''.join('<p>Paragraphe %d du jour %d, un texte en francais assez long pour compter. '
+                       'Il parle de l\'etude quotidienne et de son sens.</p>' % (j, i) for j in range(40))
+        body = '<div class="co_body">%s</div>' % para
+        for d in range(depth):
+            body = '<div class="wrap-%d"><span>Niveau %d</span>%s</div>' % (d, d, body)
+        side = '<div class="related">' + ''.join('<p><a href="/r%d">Article lie %d</a> resume.</p>' % (k, k) for k in range(30)) + '</div>'
+        pages.append(('rambam', '<html><head><title>Jour %d - fr.chabad.org</title><script>var x=1;</script></head>'
+                      '<body><nav>%s</nav><table><tr><td>%s</td><td>%s</td></tr></table>'
+                      '<footer>Restez connecté</footer></body></html>' % (i, nav, body, side)))
+    return pages
+
+
+def archived_pages(root):
+    root = Path(root)
+    latest = {}
+    with open(root / 'index.jsonl', 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                rec = json.loads(line)
+                latest[(rec['study'], rec['key'])] = rec
+    pages = []
+    for (study, _key), rec in sorted(latest.items()):
+        path = root / 'objects' / rec['hash'][:2] / (rec['hash'] + '.html.gz')
+        if path.exists():
+            pages.append((study, gzip.decompress(path.read_bytes()).decode('utf-8')))
+    return pages
+
+
+def measure(pages, parser, extract):
+    parse_ms, extract_ms, texts = [], [], []
+    for study, html in pages:
+        t0 = time.perf_counter()
+        soup = make_soup(html, parser)
+        t1 = time.perf_counter()
+        texts.append(extract(soup, True, study))
+        parse_ms.append((t1 - t0) * 1000)
+        extract_ms.append((time.perf_counter() - t1) * 1000)
+    return parse_ms, extract_ms, texts
+
+
+def _stats(values):
+    values = sorted(values)
+    return sum(values) / len(values), values[int(len(values) * 0.95)]
+
+
+def main():
+    pages = archived_pages(sys.argv[1]) if len(sys.argv) > 1 else synthetic_pages()
+    print("Pages: %d (%.0f KB)" % (len(pages), sum(len(h) for _s, h in pages) / 1024))
+    runs = [('before', 'html.parser', legacy_extract), ('after', 'html.parser', _extract)]
+    if html_extract.HTML_PARSER != 'html.parser':
+        runs.append(('after', html_extract.HTML_PARSER, _extract))
+    results = {}
+    for label, parser, extract in runs:
+        parse_ms, extract_ms, texts = measure(pages, parser, extract)
+        results[(label, parser)] = texts
+        (pm, pp), (em, ep) = _stats(parse_ms), _stats(extract_ms)
+        print("%-6s %-11s parse %7.2f ms (p95 %7.2f)  extract %7.2f ms (p95 %7.2f)  total %7.2f ms/page" % (
+            label, parser, pm, pp, em, ep, pm + em))
+    same = results[('before', 'html.parser')] == results[('after', 'html.parser')]
+    print("Same text before/after (html.parser): %s" % ('yes' if same else 'NO'))
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Benchmark hors ligne du scraping: les vrais chemins Playwright, HTTP et
+cloudscraper de scrape_daily_studies.py, sur des pages enregistrees de
+fr.chabad.org (bench_fixtures/) servies par un serveur HTTP local.
+
+Par page et par moteur: navigation (+ verification Cloudflare), attente du
+contenu (READY_JS), extraction (EXTRACT_JS ou extract_text_bs), nettoyage.
+Resume: moyenne/p95 par etape, pages par minute, exactitude par rapport aux
+textes de reference (.txt) - texte identique a l'espace pres, et ratio difflib.
+Pas de DELAY entre les pages: on mesure le moteur, pas la politesse.
+
+python bench_scrape.py [--engines playwright,http,cloudscraper] [--rounds N]
+                       [--latency MS] [--json FILE]
+python bench_scrape.py --seed            fixtures synthetiques depuis hyy-data.json
+python bench_scrape.py --record DIR      fixtures depuis une archive (--archive DIR)
+
+Les fixtures --seed enveloppent les textes de hyy-data.json dans un balisage
+maison: l'exactitude n'y mesure qu'un aller-retour, pas l'extraction sur le
+vrai balisage de fr.chabad.org. Seules les pages enregistrees (--record, ou
+l'artefact bench-fixtures du workflow, qui les tire de l'archive HTML de la
+nuit) detectent une regression.
+"""
+
+import sys
+import argparse
+import gzip
+import html
+import json
+import threading
+import time
+from datetime import date
+from difflib import SequenceMatcher
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+FIXTURES_DIR = ROOT / "bench_fixtures"
+MANIFEST = FIXTURES_DIR / "manifest.json"
+DATA_FILE = ROOT / "hyy-data.json"
+STUDIES = ("hayom_yom", "rambam", "tanya", "houmash")
+ENGINES = ("playwright", "http", "cloudscraper")
+
+# Static resources referenced by the fixtures, so that resource blocking has something to block
+ASSETS = {
+    "/static/site.css": ("text/css", "body{font-family:serif}" * 2000),
+    "/static/site.js": ("application/javascript", "var site={};" * 3000),
+    "/static/logo.png": ("image/png", "\x89PNG" + "." * 40000),
+    "/static/font.woff2": ("font/woff2", "wOF2" + "." * 35000),
+}
+
+
+# --- Fixtures ---
+
+def _page(title, body):
+    return ('<!DOCTYPE html>\n<html lang="fr"><head><meta charset="utf-8">'
+            '<title>%s - fr.chabad.org</title>'
+            '<link rel="stylesheet" href="/static/site.css">'
+            '<style>@font-face{font-family:x;src:url(/static/font.woff2)}</style>'
+            '<script src="/static/site.js"></script></head><body>'
+            '<header id="SiteHeader"><img src="/static/logo.png" alt="Chabad.org">'
+            '<ul class="menu"><li><a href="/login">Connexion</a></li><li><a href="/subscribe">S\'abonner</a></li>'
+            '<li><a href="/magazine">Magazine</a></li><li><a href="/centers">Trouver un centre</a></li></ul></header>'
+            '<nav class="breadcrumb"><a href="/">Accueil</a> &gt; <a href="/dailystudy/">Etudes quotidiennes</a></nav>'
+            '%s'
+            '<div class="sidebar"><p><a href="/dailystudy/tanya.asp">Tanya</a></p>'
+            '<p><a href="/dailystudy/rambam.asp">Rambam</a></p></div>'
+            '<footer><p>Restez connecté avec le meilleur de Chabad.org</p>'
+            '<p>Chaque semaine, dans votre boîte mail</p><form><input name="email_placeholder">'
+            '<button>S\'abonner</button></form></footer></body></html>\n' % (html.escape(title), body))
+
+
+def _paragraphs(text):
+    return ''.join('<p>%s</p>' % html.escape(line) for line in text.split('\n') if line.strip())
+
+
+def seed_page(study, title, text):
+    """chabad-like page around a stored text. Rambam/Tanya/Houmash get the header
+    and footers that clean_and_classify removes, Hayom Yom is stored as extracted."""
+    inner = _paragraphs(text)
+    if study != 'hayom_yom':
+        inner = ("<p>Calendrier juif</p><p>Etudes</p><p>%s</p><p>Aujourd'hui</p>%s"
+                 "<p>Jeudi 5 mars 2026 / 16 adar 5786</p><p>Aujourd'hui</p><p>Demain</p>"
+                 "<p>Téléchargez le calendrier</p>" % (html.escape(title), inner))
+    if study == 'tanya':
+        inner = '<div class="js-tanya-body">%s</div>' % inner
+    return _page(title, '<div id="ContentBody"><div class="co_body article-body">%s</div></div>' % inner)
+
+
+def warmup_page():
+    links = ''.join('<li><a href="/dailystudy/%s">%s</a></li>' % (s, s) for s in STUDIES)
+    return _page("Etudes quotidiennes", '<div id="ContentBody"><ul>%s</ul></div>' % links)
+
+
+def _entry_text(value):
+    return value.get('text', '') if isinstance(value, dict) else value
+
+
+def write_fixtures(pages, source):
+    """pages: {study: (key, title, html, golden)}. Keeps entries not given (e.g. a study
+    missing from an archive) and always (re)writes the warm-up page."""
+    FIXTURES_DIR.mkdir(exist_ok=True)
+    manifest = load_manifest() if MANIFEST.exists() else {'version': 1, 'pages': {}}
+    (FIXTURES_DIR / 'warmup.html').write_text(warmup_page(), encoding='utf-8')
+    manifest['pages']['warmup'] = {'html': 'warmup.html'}
+    for study, (key, title, page, golden) in pages.items():
+        (FIXTURES_DIR / (study + '.html')).write_text(page, encoding='utf-8')
+        (FIXTURES_DIR / (study + '.txt')).write_text(golden, encoding='utf-8')
+        manifest['pages'][study] = {'html': study + '.html', 'golden': study + '.txt',
+                                    'key': key, 'title': title, 'source': source}
+    with open(MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    print("%d fixtures (%s) in %s" % (len(pages), source, FIXTURES_DIR))
+
+
+def seed_fixtures():
+    with open(DATA_FILE, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    pages = {}
+    for study in STUDIES:
+        entries = data.get(study) or {}
+        key = next((k for k in sorted(entries) if len(_entry_text(entries[k])) > 500), None)
+        if key is None:
+            continue
+        value = entries[key]
+        golden = _entry_text(value)
+        title = (value.get('title') if isinstance(value, dict) else None) or study
+        pages[study] = (key, title, seed_page(study, title, golden), golden)
+    write_fixtures(pages, 'seed')
+
+
+def record_fixtures(archive_dir):
+    """Latest archived page of each study that has an entry in hyy-data.json."""
+    root = Path(archive_dir)
+    with open(DATA_FILE, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    latest = {}
+    with open(root / 'index.jsonl', 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if rec['key'] in (data.get(rec['study']) or {}):
+                latest[rec['study']] = rec
+    pages = {}
+    for study, rec in latest.items():
+        path = root / 'objects' / rec['hash'][:2] / (rec['hash'] + '.html.gz')
+        if not path.exists():
+            continue
+        value = data[study][rec['key']]
+        title = (value.get('title') if isinstance(value, dict) else None) or study
+        pages[study] = (rec['key'], title, gzip.decompress(path.read_bytes()).decode('utf-8'), _entry_text(value))
+    write_fixtures(pages, 'archive')
+
+
+def load_manifest():
+    with open(MANIFEST, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# --- Local stand-in for fr.chabad.org ---
+
+class FixtureServer:
+    """/dailystudy/<page>.asp?... -> fixture of the study, /dailystudy/ -> warm-up page,
+    /static/* -> ASSETS. `latency` (ms) is added to every response."""
+
+    def __init__(self, routes, latency=0):
+        self.routes = routes
+        self.latency = latency / 1000
+        self.requests = 0
+        bench = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            wbufsize = 1 << 16  # headers and body in one send (no delayed-ACK stall on keep-alive)
+
+            def do_GET(self):
+                bench.requests += 1
+                if bench.latency:
+                    time.sleep(bench.latency)
+                path = self.path.split('?', 1)[0]
+                if path in bench.routes:
+                    ctype, body = "text/html; charset=utf-8", bench.routes[path]
+                elif path in ASSETS:
+                    ctype, body = ASSETS[path]
+                else:
+                    ctype, body = "text/plain", "not found"
+                raw = body.encode('utf-8')
+                self.send_response(200 if body != "not found" else 404)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base = "http://127.0.0.1:%d" % self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def fixture_routes(sds, manifest):
+    routes, golden = {}, {}
+    for name, page in manifest['pages'].items():
+        body = (FIXTURES_DIR / page['html']).read_text(encoding='utf-8')
+        if name == 'warmup':
+            routes['/dailystudy/'] = body
+            continue
+        routes['/dailystudy/' + sds.PAGES[name].split('?', 1)[0]] = body
+        golden[name] = (FIXTURES_DIR / page['golden']).read_text(encoding='utf-8')
+    return routes, golden
+
+
+def point_at(sds, base):
+    """Send the scraper's URLs to the local server and let the resource filter through."""
+    sds.BASE_URL = base + "/dailystudy"
+    sds.WARMUP_URL = base + "/dailystudy/"
+    if "127.0.0.1" not in sds.RESOURCE_HOSTS:
+        sds.RESOURCE_HOSTS = sds.RESOURCE_HOSTS + ("127.0.0.1",)
+
+
+# --- Engines ---
+
+def _clean(sds, study, text):
+    """What update_data stores: Hayom Yom as extracted, the others cleaned."""
+    if not text or study == 'hayom_yom':
+        return text
+    return sds.clean_and_classify(text)[0]
+
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, (time.perf_counter() - t0) * 1000
+
+
+def run_playwright(sds, studies, rounds):
+    samples = []
+    with sds.sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        context = browser.new_context(user_agent=sds.DEFAULT_UA, locale="fr-FR")
+        page = context.new_page()
+        filt = sds.ResourceFilter().install(page)
+        sds.warmup(page, max_wait=10, filt=filt)
+        today = date.today()
+        for _r in range(rounds):
+            for study in studies:
+                url = sds._study_url(sds.PAGES[study], today)
+                filt.study = study
+                t0 = time.monotonic()
+                page.goto(url, wait_until="domcontentloaded", timeout=30000)
+                sds.wait_for_cloudflare(page, max_wait=4)
+                t1 = time.monotonic()
+                _ready, ready_ms = sds.wait_for_content(page, study, t1)
+                result, extract_ms = _timed(page.evaluate, sds.EXTRACT_JS, study)
+                text, clean_ms = _timed(_clean, sds, study, result.get('text'))
+                samples.append({'study': study, 'text': text, 'method': result.get('method'),
+                                'nav': (t1 - t0) * 1000, 'ready': ready_ms,
+                                'extract': extract_ms, 'extract_js': result.get('ms', 0), 'clean': clean_ms})
+        browser.close()
+    sds.ResourceFilter.report([filt])
+    return samples
+
+
+def _run_get(sds, get, studies, rounds, keep_lines):
+    samples = []
+    today = date.today()
+    for _r in range(rounds):
+        for study in studies:
+            url = sds._study_url(sds.PAGES[study], today)
+            r, nav_ms = _timed(get, url)
+            timing = {}
+            raw = sds.extract_text_bs(r.text, keep_lines=keep_lines, study=study, timing=timing)
+            text, clean_ms = _timed(_clean, sds, study, raw)
+            samples.append({'study': study, 'text': text, 'method': sds.html_extract.HTML_PARSER,
+                            'nav': nav_ms, 'parse': timing['parse_ms'],
+                            'extract': timing['extract_ms'], 'clean': clean_ms})
+    return samples
+
+
+def run_http(sds, studies, rounds):
+    """HttpFetcher's session and extraction (keep_lines, as in the bulk modes)."""
+    fetcher = sds.HttpFetcher([], sds.DEFAULT_UA)
+    try:
+        return _run_get(sds, lambda url: fetcher.session.get(url, timeout=30), studies, rounds, True)
+    finally:
+        fetcher.close()
+
+
+def run_cloudscraper(sds, studies, rounds):
+    """scrape_cloudscraper's scraper and extraction."""
+    scraper = sds.cloudscraper.create_scraper(
+        browser={'browser': 'chrome', 'platform': 'darwin', 'desktop': True}, delay=10)
+    return _run_get(sds, lambda url: scraper.get(url, timeout=30), studies, rounds, False)
+
+
+def load_engines(sds, wanted):
+    """Import only what each wanted engine needs: {engine: installed}."""
+    loaders = {'playwright': sds.load_playwright, 'http': sds.load_http, 'cloudscraper': sds.load_cloudscraper}
+    return {engine: loaders[engine]() for engine in wanted}
+
+
+# --- Report ---
+
+def _norm(text):
+    return ' '.join((text or '').split())
+
+
+def accuracy(text, golden):
+    a, b = _norm(text), _norm(golden)
+    if a == b:
+        return 1.0
+    return SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def _stats(values):
+    values = sorted(values)
+    return sum(values) / len(values), values[min(len(values) - 1, int(len(values) * 0.95))]
+
+
+def summarize(engine, samples, elapsed, golden, sources):
+    stages = [s for s in ('nav', 'ready', 'parse', 'extract', 'extract_js', 'clean') if s in samples[0]]
+    scores = [accuracy(s['text'], golden[s['study']]) for s in samples]
+    report = {'engine': engine, 'pages': len(samples), 'elapsed_s': round(elapsed, 3),
+              'pages_per_min': round(len(samples) / elapsed * 60, 1),
+              'exact': sum(1 for x in scores if x == 1.0), 'accuracy': round(sum(scores) / len(scores), 4),
+              'stages': {}, 'studies': {}}
+    for stage in stages:
+        mean, p95 = _stats([s[stage] for s in samples])
+        report['stages'][stage] = {'mean_ms': round(mean, 2), 'p95_ms': round(p95, 2)}
+    for study in sorted(set(s['study'] for s in samples)):
+        mine = [(s, x) for s, x in zip(samples, scores) if s['study'] == study]
+        report['studies'][study] = {'accuracy': round(sum(x for _s, x in mine) / len(mine), 4),
+                                    'method': mine[-1][0]['method'], 'source': sources.get(study, '?'),
+                                    'chars': len(mine[-1][0]['text'] or '')}
+    return report
+
+
+def print_report(report):
+    print("\n%s: %d pages in %.1fs, %.0f pages/min, exact %d/%d, accuracy %.1f%%" % (
+        report['engine'], report['pages'], report['elapsed_s'], report['pages_per_min'],
+        report['exact'], report['pages'], report['accuracy'] * 100))
+    for stage, st in report['stages'].items():
+        print("  %-8s %8.2f ms (p95 %8.2f)" % (stage, st['mean_ms'], st['p95_ms']))
+    for study, st in report['studies'].items():
+        print("  %-10s %6.1f%%  %6d chars  [%s] %s" % (study, st['accuracy'] * 100, st['chars'], st['method'], st['source']))
+    seeded = [study for study, st in report['studies'].items() if st['source'] == 'seed']
+    if seeded:
+        print("  ! %s: seed fixtures, accuracy is a round trip through synthetic markup, not real pages"
+              " (python bench_scrape.py --record ARCHIVE_DIR)" % ', '.join(seeded))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Offline scrape benchmark on bench_fixtures/.")
+    parser.add_argument('--engines', default=','.join(ENGINES),
+                        help="comma-separated, among %s" % ', '.join(ENGINES))
+    parser.add_argument('--rounds', type=int, default=3, help="passes over the fixtures per engine")
+    parser.add_argument('--latency', type=int, default=0, metavar='MS', help="added to every response")
+    parser.add_argument('--json', metavar='FILE', help="write the report as JSON")
+    fixtures = parser.add_mutually_exclusive_group()
+    fixtures.add_argument('--seed', action='store_true', help="synthetic fixtures from hyy-data.json")
+    fixtures.add_argument('--record', metavar='DIR', help="fixtures from an HTML archive (--archive DIR)")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    wanted = args.engines.split(',')
+    unknown = [e for e in wanted if e not in ENGINES]
+    if unknown:
+        parser.error("unknown engine: %s" % ', '.join(unknown))
+    if args.seed:
+        seed_fixtures()
+        return
+    if args.record:
+        record_fixtures(args.record)
+        return
+    if not MANIFEST.exists():
+        print("No fixtures: python bench_scrape.py --seed (or --record ARCHIVE_DIR)")
+        sys.exit(1)
+
+    import scrape_daily_studies as sds
+    have = load_engines(sds, wanted)
+    manifest = load_manifest()
+    routes, golden = fixture_routes(sds, manifest)
+    studies = [s for s in sds.PAGES if s in golden]
+    sources = {s: manifest['pages'][s].get('source', '?') for s in studies}
+    server = FixtureServer(routes, latency=args.latency)
+    point_at(sds, server.base)
+    print("Fixtures: %s (%s), server %s" % (', '.join(studies), ', '.join(sorted(set(sources.values()))), server.base))
+
+    reports = []
+    try:
+        for engine in wanted:
+            if not have[engine]:
+                print("\n%s: not installed, skipped" % engine)
+                continue
+            t0 = time.perf_counter()
+            samples = globals()['run_' + engine](sds, studies, args.rounds)
+            report = summarize(engine, samples, time.perf_counter() - t0, golden, sources)
+            print_report(report)
+            reports.append(report)
+    finally:
+        server.close()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'date': date.today().isoformat(), 'rounds': args.rounds, 'engines': reports}, f, indent=2)
+            f.write('\n')
+        print("\nReport: %s" % args.json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Build des fichiers JSON servis par l'app.
+- JSON minifie, nom avec le hash du contenu: dist/<nom>.<hash>.json
+- variantes precompressees .gz et .br (si le module brotli est installe), pour
+  un hebergeur qui sert les fichiers precompresses; pas versionnees (.gitignore):
+  GitHub Pages compresse lui-meme et les ignore
+- dist/data-manifest.json: nom d'origine -> fichier hashe (js/data-assets.js, sw.js)
+Les fichiers hashes ne changent jamais: ils peuvent etre caches indefiniment.
+"""
+
+import sys
+import json
+import gzip
+import hashlib
+import os
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = Path(__file__).resolve().parent
+DIST_DIR = ROOT / "dist"
+MANIFEST = DIST_DIR / "data-manifest.json"
+SOURCES = ["hyy-data.json", "brachot_complete.json", "kriat_chema_complete.json", "data/*.json"]
+HASH_LEN = 10
+
+
+def _sources():
+    files = []
+    for pattern in SOURCES:
+        files.extend(sorted(ROOT.glob(pattern)))
+    return files
+
+
+def _write(path, payload):
+    """Atomic write, skipped when the file already holds these bytes."""
+    if path.exists() and path.read_bytes() == payload:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(payload)
+    os.replace(tmp, path)
+    return True
+
+
+def build_one(src):
+    """Minify + hash + compress one JSON file. Returns its manifest entry."""
+    with open(src, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    digest = hashlib.sha256(payload).hexdigest()[:HASH_LEN]
+    rel = src.relative_to(ROOT)
+    out = DIST_DIR / rel.parent / ("%s.%s.json" % (rel.stem, digest))
+
+    entry = {"path": out.relative_to(ROOT).as_posix(), "hash": digest,
+             "bytes": len(payload), "source_bytes": src.stat().st_size}
+    _write(out, payload)
+    gz = gzip.compress(payload, compresslevel=9, mtime=0)
+    _write(out.with_name(out.name + ".gz"), gz)
+    entry["gz"] = len(gz)
+    if brotli is not None:
+        br = brotli.compress(payload, quality=11)
+        _write(out.with_name(out.name + ".br"), br)
+        entry["br"] = len(br)
+    return rel.as_posix(), entry
+
+
+def build():
+    files = {}
+    for src in _sources():
+        try:
+            name, entry = build_one(src)
+        except ValueError as e:
+            print("x %s: invalid JSON (%s)" % (src.relative_to(ROOT), e))
+            continue
+        files[name] = entry
+        print("%-32s %8d -> %7d min, %7d gz, %s br  %s" % (
+            name, entry["source_bytes"], entry["bytes"], entry["gz"],
+            entry.get("br", "-"), entry["path"]))
+
+    # Drop hashed files of older builds
+    keep = set()
+    for entry in files.values():
+        base = ROOT / entry["path"]
+        keep.update({base, base.with_name(base.name + ".gz"), base.with_name(base.name + ".br")})
+    for path in DIST_DIR.rglob("*"):
+        if path.is_file() and path != MANIFEST and path not in keep:
+            path.unlink()
+
+    manifest = json.dumps({"version": 1, "files": files}, ensure_ascii=False, indent=1, sort_keys=True)
+    _write(MANIFEST, (manifest + "\n").encode("utf-8"))
+    if brotli is None:
+        print("(brotli non installe: pas de variantes .br)")
+    print("Manifest: %s (%d files)" % (MANIFEST.relative_to(ROOT), len(files)))
+    return files
+
+
+def main():
+    if not build():
+        print("Aucun fichier JSON trouve")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Choix du moteur par etude: chaque page part sur le moteur le moins cher qui
+marche en ce moment pour son etude.
+
+  http          requests + cookie cf_clearance du navigateur (le moins cher)
+  cloudscraper  session cloudscraper, sans navigateur
+  browser       page Playwright du context partage
+  slow          un context neuf par page, rythme par TokenBucket (le plus lent)
+
+Par (etude, moteur): appels, succes, challenges, latence, et un disjoncteur.
+BREAKER_THRESHOLD echecs de suite (challenge Cloudflare, page vide, erreur)
+l'ouvrent: le moteur n'est plus essaye pour cette etude pendant `cooldown`,
+puis une seule page de test (semi-ouvert). Succes: referme. Echec: rouvert
+pour deux fois plus longtemps (jusqu'a BREAKER_COOLDOWN_MAX).
+
+  ENGINES.route(study, ['http', 'browser', 'slow'])  -> moteurs a essayer, un par un
+  ENGINES.record(study, engine, outcome, ms)
+
+Avec --state DIR, l'etat des disjoncteurs est garde d'une nuit a l'autre.
+"""
+
+import json
+import os
+import threading
+import time
+
+from scrape_metrics import METRICS, percentile
+
+ENGINE_ORDER = ('http', 'cloudscraper', 'browser', 'slow')  # cheapest first
+BREAKER_THRESHOLD = 3          # failures in a row before an engine is skipped for a study
+BREAKER_COOLDOWN = 120         # s before the first test page
+BREAKER_COOLDOWN_MAX = 3600    # s, doubled after each failed test page up to this
+
+
+class Breaker:
+    """closed -> open (BREAKER_THRESHOLD failures) -> half-open (one test page
+    after `cooldown`) -> closed on success, open again for twice as long on failure."""
+
+    def __init__(self):
+        self.failures = 0
+        self.until = None   # wall clock time the breaker is open until, None: closed
+        self.cooldown = BREAKER_COOLDOWN
+        self.probing = False
+
+    @property
+    def state(self):
+        if self.until is None:
+            return 'closed'
+        return 'half-open' if self.probing or time.time() >= self.until else 'open'
+
+    def allow(self):
+        if self.until is None:
+            return True
+        if self.probing or time.time() < self.until:
+            return False
+        self.probing = True
+        return True
+
+    def success(self):
+        self.failures = 0
+        self.until = None
+        self.probing = False
+        self.cooldown = BREAKER_COOLDOWN
+
+    def failure(self):
+        """Returns True when this failure opens the breaker."""
+        self.failures += 1
+        if self.probing:
+            self.cooldown = min(BREAKER_COOLDOWN_MAX, self.cooldown * 2)
+        elif self.until is not None or self.failures < BREAKER_THRESHOLD:
+            return False
+        self.probing = False
+        self.until = time.time() + self.cooldown
+        return True
+
+
+class EngineRouter:
+    """Thread-safe: HttpFetcher.fetch records from worker threads (asyncio.to_thread)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.breakers = {}  # (study, engine) -> Breaker
+        self.stats = {}     # (study, engine) -> {'calls', 'ok', 'challenge', 'ms': [...]}
+
+    def _breaker(self, study, engine):
+        key = (study, engine)
+        if key not in self.breakers:
+            self.breakers[key] = Breaker()
+        return self.breakers[key]
+
+    def route(self, study, engines):
+        """The engines of `engines` (cheapest first) to try for one page of
+        `study`, one at a time: those whose breaker lets a page through. The
+        last one is the fallback and is kept even when every breaker is open.
+        Lazy: a half-open breaker only gives its test page to the engine when
+        the caller gets that far (a cheaper engine that succeeds leaves it free)."""
+        for engine in engines[:-1]:
+            with self._lock:
+                allowed = self._breaker(study, engine).allow()
+            if allowed:
+                yield engine
+        yield from engines[-1:]
+
+    def record(self, study, engine, outcome, ms=0):
+        """outcome: 'ok' (including not modified), 'challenge', 'empty' or 'error'."""
+        with self._lock:
+            st = self.stats.setdefault((study, engine), {'calls': 0, 'ok': 0, 'challenge': 0, 'ms': []})
+            st['calls'] += 1
+            st['ms'].append(ms)
+            breaker = self._breaker(study, engine)
+            if outcome == 'ok':
+                st['ok'] += 1
+                breaker.success()
+                return
+            if outcome == 'challenge':
+                st['challenge'] += 1
+            opened = breaker.failure()
+        if opened:
+            METRICS.count('breaker_open', study)
+            print("    [engine] %s %s: %d failures, skipped for %ds" % (study, engine, breaker.failures, breaker.cooldown))
+
+    def report(self):
+        for (study, engine), st in sorted(self.stats.items(), key=lambda kv: (kv[0][0], ENGINE_ORDER.index(kv[0][1]))):
+            ms = sorted(st['ms'])
+            print("[engine] %-9s %-12s %3d pages, ok %3.0f%%, challenges %3.0f%%, p50 %5d ms, %s" % (
+                study, engine, st['calls'], 100.0 * st['ok'] / st['calls'], 100.0 * st['challenge'] / st['calls'],
+                percentile(ms, 0.5), self._breaker(study, engine).state))
+
+    # --- Breakers kept across runs (--state DIR) ---
+
+    def load(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, b in saved.items():
+            study, engine = key.split(':', 1)
+            breaker = self._breaker(study, engine)
+            breaker.failures, breaker.cooldown, breaker.until = b['failures'], b['cooldown'], b['until']
+            if breaker.until and breaker.until > now:
+                print("[engine] %s %s skipped for %ds more (previous run)" % (study, engine, breaker.until - now))
+
+    def save(self, path):
+        with self._lock:
+            saved = {"%s:%s" % key: {'failures': b.failures, 'cooldown': b.cooldown, 'until': b.until}
+                     for key, b in sorted(self.breakers.items()) if b.failures or b.until}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = "%s.tmp" % path
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(saved, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+
+
+ENGINES = EngineRouter()
@@ -0,0 +1,219 @@
+"""
+Calendrier hebraique (arithmetique entiere, tables par annee en cache).
+
+greg_to_hebrew(2026, 3, 5) -> {'hy': 5786, 'hm': 6, 'hd': 16, 'mName': 'Adar'}
+hebrew_to_greg(5786, 6, 16) -> date(2026, 3, 5)
+date_range_keys(start, end) -> [(date, 'Adar_16'), ...]
+nearest_dates({'Adar_I_5'}, date.today()) -> {'Adar_I_5': date(2027, 2, 12)}
+
+Mois numerotes a partir de Tishrei: 1 Tishrei ... 6 Adar (Adar I en annee
+embolismique), 7 Adar II (annees embolismiques seulement), 8 Nisan ... 13 Elul.
+Les jours sont des "rata die" (date.toordinal()).
+"""
+
+from bisect import bisect_right
+from datetime import date, timedelta
+from functools import lru_cache
+
+EPOCH = -1373427  # elapsed_days(hy) + EPOCH = rata die of 1 Tishrei
+
+MONTH_NAMES = {1: 'Tishrei', 2: 'Cheshvan', 3: 'Kislev', 4: 'Tevet', 5: 'Shevat',
+               6: 'Adar I', 7: 'Adar II', 8: 'Nisan', 9: 'Iyyar', 10: 'Sivan',
+               11: 'Tammuz', 12: 'Av', 13: 'Elul'}
+
+
+def _molad_days(hy):
+    """Molad Tishrei in days, with the lo ADU rosh and molad zaken delays."""
+    months = (235 * hy - 234) // 19
+    parts = 12084 + 13753 * months
+    day = 29 * months + parts // 25920
+    if (3 * (day + 1)) % 7 < 3:
+        day += 1
+    return day
+
+
+def elapsed_days(hy):
+    """Days from the epoch to 1 Tishrei of year hy, all four dehiyyot included
+    (GaTaRaD / BeTUTaKPaT keep every year at 353-355 or 383-385 days)."""
+    day = _molad_days(hy)
+    if _molad_days(hy + 1) - day == 356:
+        return day + 2
+    if day - _molad_days(hy - 1) == 382:
+        return day + 1
+    return day
+
+
+def is_leap(hy):
+    return (7 * hy + 1) % 19 < 7
+
+
+class YearInfo:
+    """Everything needed to place a day inside Hebrew year `hy`."""
+    __slots__ = ('hy', 'start', 'length', 'leap', 'months', 'month_starts', 'month_lengths')
+
+    def __init__(self, hy):
+        self.hy = hy
+        self.start = elapsed_days(hy) + EPOCH  # rata die of 1 Tishrei
+        self.length = elapsed_days(hy + 1) - elapsed_days(hy)
+        self.leap = is_leap(hy)
+        self.months = []
+        self.month_starts = []   # day-of-year offset (0-based) of day 1 of each month
+        self.month_lengths = []
+        offset = 0
+        for hm in range(1, 14):
+            n = self._month_days(hm)
+            if not n:
+                continue
+            self.months.append(hm)
+            self.month_starts.append(offset)
+            self.month_lengths.append(n)
+            offset += n
+
+    def _month_days(self, hm):
+        if hm == 2: return 30 if self.length % 10 == 5 else 29
+        if hm == 3: return 30 if self.length % 10 != 3 else 29
+        if hm == 4: return 29
+        if hm == 6: return 30 if self.leap else 29
+        if hm == 7: return 29 if self.leap else 0
+        if hm in (9, 11, 13): return 29
+        return 30
+
+    def month_name(self, hm):
+        if hm == 6 and not self.leap:
+            return 'Adar'
+        return MONTH_NAMES[hm]
+
+    def locate(self, rd):
+        """(hm, hd) of rata die `rd`, which must fall inside this year."""
+        offset = rd - self.start
+        i = bisect_right(self.month_starts, offset) - 1
+        return self.months[i], offset - self.month_starts[i] + 1
+
+    def month_start(self, hm):
+        """Rata die of day 1 of month hm, or None if the month does not exist this year."""
+        try:
+            return self.start + self.month_starts[self.months.index(hm)]
+        except ValueError:
+            return None
+
+
+@lru_cache(maxsize=None)
+def year_info(hy):
+    return YearInfo(hy)
+
+
+def year_of(rd):
+    """Hebrew year containing rata die `rd`."""
+    hy = (rd - EPOCH) * 98496 // 35975351 + 1  # mean year length 35975351/98496 days
+    while year_info(hy).start > rd:
+        hy -= 1
+    while year_info(hy + 1).start <= rd:
+        hy += 1
+    return hy
+
+
+def _as_dict(info, hm, hd):
+    return {'hy': info.hy, 'hm': hm, 'hd': hd, 'mName': info.month_name(hm)}
+
+
+def rd_to_hebrew(rd):
+    info = year_info(year_of(rd))
+    hm, hd = info.locate(rd)
+    return _as_dict(info, hm, hd)
+
+
+def greg_to_hebrew(gy, gm, gd):
+    """Gregorian date -> {'hy', 'hm', 'hd', 'mName'}."""
+    return rd_to_hebrew(date(gy, gm, gd).toordinal())
+
+
+def hebrew_to_greg(hy, hm, hd):
+    """Hebrew date -> datetime.date. ValueError if the month/day does not exist in hy."""
+    info = year_info(hy)
+    start = info.month_start(hm)
+    if start is None:
+        raise ValueError("month %d does not exist in %d" % (hm, hy))
+    if not 1 <= hd <= info.month_lengths[info.months.index(hm)]:
+        raise ValueError("day %d out of range for month %d of %d" % (hd, hm, hy))
+    return date.fromordinal(start + hd - 1)
+
+
+def hyy_key(heb):
+    """Hayom Yom key of a Hebrew date dict: 'Adar_I_5', 'Nisan_12'..."""
+    return "%s_%d" % (heb['mName'].replace(' ', '_'), heb['hd'])
+
+
+def date_range(start, end):
+    """Hebrew dates of every day in [start, end), walking the year tables
+    instead of converting each day. Yields (date, heb dict)."""
+    rd, stop = start.toordinal(), end.toordinal()
+    if rd >= stop:
+        return
+    info = year_info(year_of(rd))
+    hm, hd = info.locate(rd)
+    i = info.months.index(hm)
+    day = start
+    while rd < stop:
+        yield day, _as_dict(info, hm, hd)
+        rd += 1
+        day += timedelta(days=1)
+        hd += 1
+        if hd > info.month_lengths[i]:
+            hd, i = 1, i + 1
+            if i == len(info.months):
+                info, i = year_info(info.hy + 1), 0
+            hm = info.months[i]
+
+
+def date_range_keys(start, end):
+    """[(date, hyy key)] for every day in [start, end)."""
+    return [(d, hyy_key(heb)) for d, heb in date_range(start, end)]
+
+
+def all_hyy_keys():
+    """Every Hayom Yom key a year can produce: 'Adar_*' in regular years,
+    'Adar_I_*' / 'Adar_II_*' in leap years, Cheshvan_30 / Kislev_30 in full years."""
+    keys = set()
+    for hm, name in MONTH_NAMES.items():
+        longest = 29 if hm in (4, 7, 9, 11, 13) else 30
+        names = [(name, longest)] + ([('Adar', 29)] if hm == 6 else [])
+        for name, n in names:
+            keys.update("%s_%d" % (name.replace(' ', '_'), hd) for hd in range(1, n + 1))
+    return keys
+
+
+def year_keys(hy):
+    """{hyy key: date} for every day of Hebrew year hy."""
+    info = year_info(hy)
+    out = {}
+    for hm, first, n in zip(info.months, info.month_starts, info.month_lengths):
+        name = info.month_name(hm).replace(' ', '_')
+        for hd in range(1, n + 1):
+            out["%s_%d" % (name, hd)] = date.fromordinal(info.start + first + hd - 1)
+    return out
+
+
+def nearest_dates(keys, around, max_years=50):
+    """{key: date} with the date closest to `around` on which each key falls
+    (ties go to the future). Keys not met within max_years are left out."""
+    target = around.toordinal()
+    want = set(keys)
+    found = {}
+    hy = year_of(target)
+    for k in range(max_years):
+        # Every day of years hy +- k is at least k - 1 full years (353+ days each) away
+        if len(found) == len(want) and all(abs(d.toordinal() - target) < (k - 1) * 353 for d in found.values()):
+            break
+        for y in ((hy,) if k == 0 else (hy + k, hy - k)):
+            for key, d in year_keys(y).items():
+                if key not in want:
+                    continue
+                dist = abs(d.toordinal() - target)
+                best = found.get(key)
+                if best is None:
+                    found[key] = d
+                    continue
+                best_dist = abs(best.toordinal() - target)
+                if dist < best_dist or (dist == best_dist and d > best):  # ties go to the future
+                    found[key] = d
+    return found
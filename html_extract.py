@@ -0,0 +1,147 @@
+"""
+Extraction du texte d'une page HTML avec BeautifulSoup (chemins HTTP,
+cloudscraper et --reextract), avec les memes regles que EXTRACT_JS.
+
+- parseur: lxml (C) s'il est installe, sinon html.parser (HTML_PARSER, --parser)
+- selecteurs des tiers: une seule passe soupsieve pour tous, puis l'ordre de
+  priorite sur les quelques elements trouves (au lieu d'un select_one par selecteur)
+- recherche du plus grand bloc: longueurs de texte et de liens calculees une
+  seule fois par noeud, des feuilles vers la racine, au lieu d'un get_text et
+  d'un find_all('a') par candidat (quadratique sur les pages profondes)
+bench_extract.py mesure parse + extraction avant/apres.
+"""
+
+import re
+import time
+from functools import lru_cache
+
+import soupsieve
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+from text_cleaning import RULES, strip_boilerplate, is_nav_text, is_boilerplate, latin_ratio, accepts, study_tiers
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+_BS_BLOCK_TAGS = ['p', 'div', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+                  'blockquote', 'section', 'article', 'table', 'ul', 'ol']
+_TEXT_TYPES = (NavigableString, CData)  # what get_text() counts
+_BLOCK_SKIP_RE = re.compile(RULES['blocks']['skip'])
+
+
+@lru_cache(maxsize=None)
+def _css(selector):
+    return soupsieve.compile(selector)
+
+
+def tier_matches(soup, study):
+    """(tier, element) in priority order: for each selector of each tier, the
+    first element matching it (what select_one returns), from a single walk."""
+    tiers = study_tiers(study)
+    found = _css(', '.join(sel for _n, tier in tiers for sel in tier['selectors'])).select(soup)
+    for _name, tier in tiers:
+        for sel in tier['selectors']:
+            match = _css(sel).match
+            el = next((e for e in found if match(e)), None)
+            if el is not None:
+                yield tier, el
+
+
+def make_soup(html, parser=None):
+    return BeautifulSoup(html, parser or HTML_PARSER)
+
+
+def _bs_text(el, keep_lines):
+    if not keep_lines:
+        return re.sub(r'\s+', ' ', el.get_text(separator=' ', strip=True)).strip()
+    # Line breaks at block boundaries like innerText, clean_and_classify cuts footers on '\n'
+    for br in el.find_all('br'):
+        br.replace_with('\n')
+    for blk in el.find_all(_BS_BLOCK_TAGS):
+        blk.append('\n')
+    text = re.sub(r'[ \t\r\f\v\xa0]+', ' ', el.get_text())
+    return re.sub(r'\s*\n\s*', '\n', text).strip()
+
+
+def block_index(soup, tags):
+    """[(node, text length, link text length)] for every `tags` element, in
+    document order. Lengths are those of get_text(strip=True), computed in one
+    bottom-up pass: reversed pre-order visits each node after its descendants."""
+    tags = set(tags)
+    sizes = {}  # id(tag) -> (text, link)
+    out = []
+    for node in reversed(list(soup.descendants)):
+        if not isinstance(node, Tag):
+            continue
+        text = link = 0
+        for child in node.children:
+            if isinstance(child, Tag):
+                t, l = sizes[id(child)]
+                text += t
+                link += l
+            elif type(child) in _TEXT_TYPES:
+                text += len(child.strip())
+        if node.name == 'a':
+            link = text
+        sizes[id(node)] = (text, link)
+        if node.name in tags:
+            out.append((node, text, link))
+    out.reverse()
+    return out
+
+
+def largest_block(soup):
+    """Largest French block, else largest block of any language (RULES['blocks'])."""
+    blocks = RULES['blocks']
+    candidates = []
+    for node, n, link in block_index(soup, blocks['tags']):
+        if not blocks['min_len'] < n < blocks['max_len']:
+            continue
+        if link / n > blocks['max_link_ratio']:
+            continue
+        attrs = ' '.join(node.get('class', [])) + ' ' + (node.get('id') or '')
+        if _BLOCK_SKIP_RE.search(attrs.lower()):
+            continue
+        candidates.append((n, node))
+    # Largest first (stable: equal lengths keep document order), text only for the few looked at
+    candidates.sort(key=lambda c: -c[0])
+    best_any = None
+    for _n, node in candidates:
+        txt = node.get_text(strip=True)
+        if is_nav_text(txt) or is_boilerplate(txt):
+            continue
+        if best_any is None:
+            best_any = node
+        if latin_ratio(txt) > blocks['latin_min']:
+            return node
+    return best_any
+
+
+def extract_text_bs(html, keep_lines=False, study=None, timing=None):
+    """Same rules as EXTRACT_JS: the study's selector tiers, then the largest
+    French block, then the largest block of any language.
+    `timing` (dict) receives parse_ms and extract_ms."""
+    t0 = time.perf_counter()
+    soup = make_soup(html)
+    t1 = time.perf_counter()
+    text = _extract(soup, keep_lines, study)
+    if timing is not None:
+        timing['parse_ms'] = (t1 - t0) * 1000
+        timing['extract_ms'] = (time.perf_counter() - t1) * 1000
+    return text
+
+
+def _extract(soup, keep_lines, study):
+    for tag in soup.find_all(RULES['remove_tags']):
+        tag.decompose()
+    for tier, el in tier_matches(soup, study):
+        text = _bs_text(el, keep_lines)
+        if accepts(tier, text):
+            return strip_boilerplate(text)
+    best = largest_block(soup)
+    if best:
+        return strip_boilerplate(_bs_text(best, keep_lines))
+    return None
@@ -3820,7 +3820,7 @@ const REMINDERS = [
 ];
 
 // --- Hebrew Calendar Converter ---
-function hebrewElapsedDays(year) {
+function hebrewMoladDays(year) {
   const monthsElapsed = Math.floor((235 * year - 234) / 19);
   const partsElapsed = 12084 + 13753 * monthsElapsed;
   let day = monthsElapsed * 29 + Math.floor(partsElapsed / 25920);
@@ -3828,6 +3828,14 @@ function hebrewElapsedDays(year) {
   return day;
 }
 
+// Year-length dehiyyot: a year is never 356 or 382 days long
+function hebrewElapsedDays(year) {
+  const day = hebrewMoladDays(year);
+  if (hebrewMoladDays(year + 1) - day === 356) return day + 2;
+  if (day - hebrewMoladDays(year - 1) === 382) return day + 1;
+  return day;
+}
+
 function hebrewYearLength(year) {
   return hebrewElapsedDays(year + 1) - hebrewElapsedDays(year);
 }
@@ -7754,13 +7762,19 @@ function toggleHyy(e) {
 // ---- Pure JS Hebrew date converter ----
 function _hyyFloor(x){return Math.floor(x);}
 function _hyyMod(x,y){return x-y*_hyyFloor(x/y);}
-function _hyyHebElapsedDays(y){
+function _hyyHebMoladDays(y){
   var m=_hyyFloor((235*y-234)/19);
   var p=12084+13753*m;
   var d=29*m+_hyyFloor(p/25920);
   if(_hyyMod(3*(d+1),7)<3)d++;
   return d;
 }
+function _hyyHebElapsedDays(y){
+  var d=_hyyHebMoladDays(y);
+  if(_hyyHebMoladDays(y+1)-d==356)return d+2;
+  if(d-_hyyHebMoladDays(y-1)==382)return d+1;
+  return d;
+}
 function _hyyHebYearDays(y){return _hyyHebElapsedDays(y+1)-_hyyHebElapsedDays(y);}
 function _hyyIsLeap(y){return _hyyMod(7*y+1,19)<7;}
 function _hyyHebMonthDays(y,m){
@@ -8311,9 +8325,63 @@ function loadHayomYom() {
   _hyyLoadJson(heb, dateKey, cacheKey, hyyKey);
 }
 
+// ====== STUDY DATA (scrape_daily_studies.py) ======
+// daily/studies/YYYY-MM-DD.json holds the 4 studies of one day: one small
+// request shared by the 4 loaders. hyy-data.json is only the fallback.
+var _dailyDataCache = {};
+var _monolithicDataCache = {};
+
+function _fetchJson(url) {
+  return fetch(url).then(function(r) { if(!r.ok) throw new Error('HTTP '+r.status); return r.json(); });
+}
+
+function _monolithicData(dateKey) {
+  if (!_monolithicDataCache[dateKey]) {
+    // Hashed copy from dist/ when built: its name changes with the content, no cache buster needed
+    _monolithicDataCache[dateKey] = dataAssetUrl('hyy-data.json').then(function(url) {
+      return _fetchJson(url === 'hyy-data.json' ? url + '?_=' + dateKey : url);
+    });
+  }
+  return _monolithicDataCache[dateKey];
+}
+
+// Resolves to the hyy-data.json shape: { hayom_yom: {hyyKey: text}, rambam: {dateKey: entry}, ... }
+// or null when the day file is missing
+function _dayFile(dateKey) {
+  if (!_dailyDataCache[dateKey]) {
+    var p = dateKey.split('-');
+    var iso = p[0] + '-' + ('0' + p[1]).slice(-2) + '-' + ('0' + p[2]).slice(-2);
+    _dailyDataCache[dateKey] = _fetchJson('daily/studies/' + iso + '.json')
+      .then(function(day) {
+        var data = { hayom_yom: {}, rambam: {}, tanya: {}, houmash: {} };
+        if (day.hayom_yom) data.hayom_yom[day.hyy_key] = day.hayom_yom;
+        ['rambam', 'tanya', 'houmash'].forEach(function(s) { if (day[s]) data[s][dateKey] = day[s]; });
+        return data;
+      })
+      .catch(function(err) {
+        console.log('daily/studies/' + iso + '.json failed:', err.message);
+        return null;
+      });
+  }
+  return _dailyDataCache[dateKey];
+}
+
+function _dailyData(dateKey) {
+  return _dayFile(dateKey).then(function(data) { return data || _monolithicData(dateKey); });
+}
+
+// Hayom Yom is keyed by Hebrew date: daily/hayom_yom/<key>.json covers days without a day file
+function _hyyData(dateKey, hyyKey) {
+  return _dayFile(dateKey).then(function(data) {
+    if (data && data.hayom_yom[hyyKey]) return data;
+    return _fetchJson('daily/hayom_yom/' + encodeURIComponent(hyyKey) + '.json')
+      .then(function(entry) { var out = { hayom_yom: {} }; out.hayom_yom[hyyKey] = entry.text; return out; })
+      .catch(function() { return _monolithicData(dateKey); });
+  });
+}
+
 function _hyyLoadJson(heb, dateKey, cacheKey, hyyKey) {
-  fetch('hyy-data.json?_=' + dateKey)
-    .then(function(r) { if(!r.ok) throw new Error('HTTP '+r.status); return r.json(); })
+  _hyyData(dateKey, hyyKey)
     .then(function(data) {
       if (data.hayom_yom && data.hayom_yom[hyyKey]) {
         console.log('HYY: Found in hyy-data.json!');
@@ -8530,8 +8598,7 @@ function loadRambam() {
 }
 
 function _rambamLoadJson(dateKey, cacheKey) {
-  fetch('hyy-data.json?_=' + dateKey)
-    .then(function(r) { if(!r.ok) throw new Error('HTTP '+r.status); return r.json(); })
+  _dailyData(dateKey)
     .then(function(data) {
       if (data.rambam && data.rambam[dateKey]) {
         var entry = data.rambam[dateKey];
@@ -8632,8 +8699,7 @@ function loadTanya() {
 }
 
 function _tanyaLoadJson(dateKey, cacheKey) {
-  fetch('hyy-data.json?_=' + dateKey)
-    .then(function(r) { if(!r.ok) throw new Error('HTTP '+r.status); return r.json(); })
+  _dailyData(dateKey)
     .then(function(data) {
       if (data.tanya && data.tanya[dateKey]) {
         var entry = data.tanya[dateKey];
@@ -8753,8 +8819,7 @@ function loadHoumash() {
 }
 
 function _houmashLoadJson(dateKey, cacheKey) {
-  fetch('hyy-data.json?_=' + dateKey)
-    .then(function(r) { if(!r.ok) throw new Error('HTTP '+r.status); return r.json(); })
+  _dailyData(dateKey)
     .then(function(data) {
       if (data.houmash && data.houmash[dateKey]) {
         var entry = data.houmash[dateKey];
@@ -9016,7 +9081,7 @@ function initHoumashPanel() {
 var CHABAD_CENTERS = null;
 function _loadChabadCenters(cb) {
   if (CHABAD_CENTERS) { cb(CHABAD_CENTERS); return; }
-  fetch('data/chabad-centers.json').then(function(r) { return r.json(); }).then(function(d) {
+  fetchDataAsset('data/chabad-centers.json').then(function(r) { return r.json(); }).then(function(d) {
     CHABAD_CENTERS = d; cb(d);
   }).catch(function() { CHABAD_CENTERS = []; cb([]); });
 }
@@ -9024,7 +9089,7 @@ function _loadChabadCenters(cb) {
 var KOSHER_RESTAURANTS = null;
 function _loadKosherRestaurants(cb) {
   if (KOSHER_RESTAURANTS) { cb(KOSHER_RESTAURANTS); return; }
-  fetch('data/kosher-restaurants.json').then(function(r) { return r.json(); }).then(function(d) {
+  fetchDataAsset('data/kosher-restaurants.json').then(function(r) { return r.json(); }).then(function(d) {
     KOSHER_RESTAURANTS = d; cb(d);
   }).catch(function() { KOSHER_RESTAURANTS = []; cb([]); });
 }
@@ -0,0 +1,29 @@
+// ─── DATA ASSETS ───
+// dist/data-manifest.json (build_data.py) maps each JSON data file to a
+// content-hashed, minified copy that sw.js caches for good.
+// Falls back to the plain file when the manifest or the copy is missing.
+(function(){
+var manifestPromise=null;
+
+function loadManifest(){
+  if(!manifestPromise){
+    manifestPromise=fetch('dist/data-manifest.json',{cache:'no-cache'})
+      .then(function(r){if(!r.ok)throw new Error('HTTP '+r.status);return r.json();})
+      .then(function(m){return m.files||{};})
+      .catch(function(err){console.warn('data-manifest:',err.message);return {};});
+  }
+  return manifestPromise;
+}
+
+window.dataAssetUrl=function(name){
+  return loadManifest().then(function(files){return files[name]?files[name].path:name;});
+};
+
+// Drop-in for fetch(name) on a data file
+window.fetchDataAsset=function(name){
+  return window.dataAssetUrl(name).then(function(url){
+    if(url===name)return fetch(name);
+    return fetch(url).then(function(r){return r.ok?r:fetch(name);}).catch(function(){return fetch(name);});
+  });
+};
+})();
@@ -6,7 +6,7 @@ var kchmLangs={he:true,ph:true,fr:false};
 
 function loadKchmData(){
   if(KCHM_DATA)return Promise.resolve(KCHM_DATA);
-  return fetch('kriat_chema_complete.json')
+  return fetchDataAsset('kriat_chema_complete.json')
     .then(function(r){if(!r.ok)throw new Error('HTTP '+r.status);return r.json();})
     .then(function(data){KCHM_DATA=data;return data;})
     .catch(function(err){
@@ -103,7 +103,7 @@ var brachotLangs={he:true,ph:true,fr:false};
 
 function loadBrachotData(){
   if(BRACHOT_DATA)return Promise.resolve(BRACHOT_DATA);
-  return fetch('brachot_complete.json')
+  return fetchDataAsset('brachot_complete.json')
     .then(function(r){if(!r.ok)throw new Error('HTTP '+r.status);return r.json();})
     .then(function(data){BRACHOT_DATA=data;return data;})
     .catch(function(err){
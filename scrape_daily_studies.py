@@ -3,38 +3,105 @@
 Scrape les 4 etudes quotidiennes depuis fr.chabad.org.
 - Playwright (GitHub Action) ou cloudscraper (Mac local)
 - Warm-up Cloudflare puis scrape les 4 pages
+
+  python scrape_daily_studies.py scrape --days 7 [--refresh 7] [--shard 1/4 --resume ...]
+  python scrape_daily_studies.py plan --hyy | merge | reextract --archive DIR | stats | export
+Seul `scrape` importe le moteur (Playwright / cloudscraper), `reextract` seulement bs4.
 """
 
 import sys
 import json
+import argparse
 import time
 import re
-import math
-from datetime import datetime, date
+import asyncio
+import contextlib
+import hashlib
+import copy
+import random
+import os
+import shutil
+import gzip
+import atexit
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
 from pathlib import Path
+from urllib.parse import urlsplit
+
+from text_cleaning import (RULES, RULES_VERSION, clean_and_classify, is_garbage_text as _is_garbage_text,
+                           strip_boilerplate, study_tiers)
+from hebrew_calendar import greg_to_hebrew, hyy_key as _hyy_key, date_range, all_hyy_keys, nearest_dates
+from scrape_metrics import METRICS, print_summary
+from engine_router import ENGINES
+from study_store import StudyStore, RULES_SECTION
 
+# Engines, imported by load_engine() only for the subcommands that fetch pages:
+# plan, merge, stats, export... run without Playwright or cloudscraper installed
 USE_PLAYWRIGHT = False
 USE_CLOUDSCRAPER = False
+USE_HTTP = False  # hybrid engine: Playwright solves Cloudflare, requests fetches the pages
+sync_playwright = async_playwright = cloudscraper = requests = HTTPAdapter = None
+html_extract = extract_text_bs = None
+
+
+def load_extractor():
+    """html_extract (BeautifulSoup): HTTP and cloudscraper paths, reextract."""
+    global html_extract, extract_text_bs
+    if html_extract is None:
+        import html_extract as module
+        html_extract, extract_text_bs = module, module.extract_text_bs
+    return html_extract
 
-try:
-    from playwright.sync_api import sync_playwright
+def load_playwright():
+    global USE_PLAYWRIGHT, sync_playwright, async_playwright
+    try:
+        from playwright.sync_api import sync_playwright
+        from playwright.async_api import async_playwright
+    except ImportError:
+        return False
     USE_PLAYWRIGHT = True
-    print("[engine] Playwright")
-except ImportError:
-    pass
+    return True
 
-if not USE_PLAYWRIGHT:
+def load_cloudscraper():
+    global USE_CLOUDSCRAPER, cloudscraper
     try:
         import cloudscraper
-        from bs4 import BeautifulSoup
-        USE_CLOUDSCRAPER = True
-        print("[engine] cloudscraper")
     except ImportError:
-        pass
+        return False
+    load_extractor()
+    USE_CLOUDSCRAPER = True
+    return True
+
+def load_http():
+    """requests for HttpFetcher (clearance cookies of the browser)."""
+    global USE_HTTP, requests, HTTPAdapter
+    try:
+        import requests
+        from requests.adapters import HTTPAdapter
+    except ImportError:
+        return False
+    load_extractor()
+    USE_HTTP = True
+    return True
+
+def load_engine():
+    """Playwright, else cloudscraper; requests on top of Playwright for the
+    hybrid HTTP path. Exits if neither engine is installed."""
+    if USE_PLAYWRIGHT or USE_CLOUDSCRAPER:
+        return
+    if load_playwright():
+        print("[engine] Playwright")
+    # The engine without Playwright, else one more engine for engine_router
+    if load_cloudscraper():
+        print("[engine] %scloudscraper" % ("+ " if USE_PLAYWRIGHT else ""))
+
+    if not USE_PLAYWRIGHT and not USE_CLOUDSCRAPER:
+        print("Erreur: installer playwright ou cloudscraper")
+        sys.exit(1)
 
-if not USE_PLAYWRIGHT and not USE_CLOUDSCRAPER:
-    print("Erreur: installer playwright ou cloudscraper")
-    sys.exit(1)
+    if USE_PLAYWRIGHT and load_http():
+        print("[engine] + HTTP (clearance cookies)")
 
 
 # --- Config ---
@@ -47,180 +114,261 @@ PAGES = {
     "houmash":   "torahreading.asp",
 }
 DATA_FILE = Path("hyy-data.json")
+STORE_FILE = Path("studies.db")  # SQLite store (study_store), DATA_FILE is exported from it; None: JSON only
+DAILY_DIR = Path("daily")  # per-day / per-key files read by the app, None to disable
 DELAY = 4
-
-
-# --- Hebrew Date Converter ---
-
-def _floor(x): return math.floor(x)
-def _mod(x, y): return x - y * _floor(x / y)
-
-def _heb_elapsed_days(y):
-    m = _floor((235 * y - 234) / 19)
-    p = 12084 + 13753 * m
-    d = 29 * m + _floor(p / 25920)
-    if _mod(3 * (d + 1), 7) < 3: d += 1
-    return d
-
-def _heb_year_days(y): return _heb_elapsed_days(y + 1) - _heb_elapsed_days(y)
-def _is_leap(y): return _mod(7 * y + 1, 19) < 7
-
-def _heb_month_days(y, m):
-    if m == 2: return 30 if _heb_year_days(y) % 10 == 5 else 29
-    if m == 3: return 30 if _heb_year_days(y) % 10 != 3 else 29
-    if m == 4: return 29
-    if m == 6: return 30 if _is_leap(y) else 29
-    if m == 7: return 29 if _is_leap(y) else 0
-    if m in (9, 11, 13): return 29
-    return 30
-
-def _greg_to_abs(gy, gm, gd):
-    a = _floor((gy-1)/4) - _floor((gy-1)/100) + _floor((gy-1)/400)
-    b = 365*(gy-1) + a + gd
-    ml = [0,31,28,31,30,31,30,31,31,30,31,30]
-    for i in range(1, gm): b += ml[i]
-    if gm > 2 and ((gy%4==0 and gy%100!=0) or gy%400==0): b += 1
-    return b
-
-def greg_to_hebrew(gy, gm, gd):
-    abs_day = _greg_to_abs(gy, gm, gd)
-    hy = gy + 3760; epoch = -1373427
-    while _heb_elapsed_days(hy+1) + epoch <= abs_day: hy += 1
-    while _heb_elapsed_days(hy) + epoch > abs_day: hy -= 1
-    day_in_year = abs_day - (_heb_elapsed_days(hy) + epoch) + 1
-    hm = 1
-    month_order = list(range(1,14)) if _is_leap(hy) else [1,2,3,4,5,6,8,9,10,11,12,13]
-    for mo in month_order:
-        md = _heb_month_days(hy, mo)
-        if day_in_year <= md: hm = mo; break
-        day_in_year -= md
-    hd = day_in_year
-    names = {1:'Tishrei',2:'Cheshvan',3:'Kislev',4:'Tevet',5:'Shevat',
-             6:'Adar I',7:'Adar II',8:'Nisan',9:'Iyyar',10:'Sivan',
-             11:'Tammuz',12:'Av',13:'Elul'}
-    m_name = names.get(hm, '')
-    if hm == 6 and not _is_leap(hy): m_name = 'Adar'
-    return {'hy':hy, 'hm':hm, 'hd':hd, 'mName':m_name}
+WARMUP_URL = "https://fr.chabad.org/dailystudy/"
+DEFAULT_UA = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# Persistent Cloudflare state (--state DIR): storage_state saved after each warm-up,
+# restored on the next run so the warm-up is skipped while cf_clearance is good
+STATE_DIR = None
+STATE_MIN_TTL = 15 * 60     # s of cf_clearance validity left required to reuse a state
+STATE_MAX_AGE = 12 * 3600   # s, older states are thrown away whatever the cookie says
+
+# Sharding (--shard i/N): each job takes a deterministic slice of the work list
+# and writes only its new entries to PARTIAL_DIR, folded back with --merge
+SHARD = None                  # (index, count), index is 1-based
+PARTIAL_DIR = Path("partials")
+
+# Crawl journal: one JSONL line per fetch attempt, replayed with --resume
+JOURNAL_DIR = Path(".journal")
+JOURNAL_MAX_ATTEMPTS = 3   # empty/garbage pages in a row before a URL is considered broken
+JOURNAL_DONE = ('ok', 'unchanged')  # statuses that end a run of failed attempts
+JOURNAL_BROKEN = ('empty', 'garbage')  # content failures; challenges and errors stay retryable
+RESUME = False
+
+# Conditional refresh (--refresh N): Rambam/Tanya/Houmash entries of the next N
+# days are fetched again until they are final, i.e. fetched on or after their
+# own date. Unchanged content (304, or same text hash) leaves the entry as it is.
+REFRESH_HORIZON = 0
+FRESH_FIELDS = ('hash', 'fetched', 'etag', 'modified', 'method')  # kept out of the daily/ files
+
+# Raw HTML archive (--archive DIR): every fetched page, gzip, content-addressed.
+# --reextract rebuilds the entries from it without network.
+ARCHIVE_DIR = None
+
+# Run report (scrape_metrics): --metrics FILE (JSON), --prom FILE (Prometheus textfile)
+METRICS_FILE = None
+PROM_FILE = None
+
+# Concurrent engine (bulk_scrape_all)
+CONCURRENCY = 4        # pages ouvertes en parallele sur le meme context
+RATE_LIMIT = 1.0       # navigations / seconde, tous workers confondus
+HOST_CONCURRENCY = 4   # navigations simultanees max par host
+BACKOFF_MAX = 60       # pause max (s) ajoutee apres des echecs Cloudflare repetes
+# Pipeline: navigation -> POST_WORKERS processes (nettoyage, classement, titre) -> un seul writer
+PIPELINE_QUEUE = 16    # pages fetched, not yet post-processed (past this, navigation waits)
+POST_WORKERS = 2       # 0: post-process inline, in the event loop
+WRITE_BATCH = 16       # results applied to data per journal flush
+
+# Hybrid HTTP engine (bulk modes): studies fetched over HTTP with the browser's
+# cf_clearance cookie. Tanya's body is rendered client-side, it stays in the browser.
+HYBRID_HTTP = True
+HTTP_STUDIES = {"hayom_yom", "rambam", "houmash"}
+HTTP_DELAY = 1.5          # s between HTTP fetches (sequential modes)
+# Per-study engine choice and circuit breakers: engine_router (ENGINES), kept in STATE_DIR
+
+# Readiness: max wait (ms) for the content to show up after domcontentloaded
+READY_TIMEOUT = {
+    "hayom_yom": 15000,
+    "rambam":    15000,
+    "tanya":     30000,
+    "houmash":   15000,
+}
+READY_LOAD_GRACE = 1000  # ms after the load event before giving up on selectors
+
+# Request filter: resource types let through for each study, everything else is aborted.
+# None = no filtering (warm-up: the Cloudflare challenge loads whatever it needs).
+# Stylesheets stay allowed: innerText depends on computed styles.
+BLOCK_RESOURCES = True
+RESOURCE_ALLOW = {
+    "warmup":    None,
+    "hayom_yom": {"document", "script", "stylesheet", "xhr", "fetch"},
+    "rambam":    {"document", "script", "stylesheet", "xhr", "fetch"},
+    "tanya":     {"document", "script", "stylesheet", "xhr", "fetch"},
+    "houmash":   {"document", "script", "stylesheet", "xhr", "fetch"},
+}
+# Hosts allowed to serve anything at all (subdomains included). Third-party
+# trackers, ads and embeds are dropped whatever their type.
+RESOURCE_HOSTS = ("chabad.org", "challenges.cloudflare.com", "ajax.googleapis.com", "code.jquery.com")
+# Rough average size per blocked type, only used for the "saved" estimate
+RESOURCE_EST_BYTES = {"image": 40000, "font": 35000, "media": 250000, "script": 30000,
+                      "stylesheet": 15000, "document": 50000}
 
 
 # --- Playwright extraction JS ---
 
+# Selectors, markers and thresholds come from extraction_rules.json (RULES),
+# shared with extract_text_bs and text_cleaning. Call with the study name.
 EXTRACT_JS = """
-() => {
-    document.querySelectorAll('script, style, nav, iframe, noscript').forEach(el => el.remove());
+(study) => {
+    const t0 = performance.now();
+    const R = __RULES__;
+    const done = result => { result.ms = performance.now() - t0; return result; };
+    document.querySelectorAll(R.remove_tags.join(', ')).forEach(el => el.remove());
+
+    const hebrewRe = new RegExp(R.chars.hebrew, 'g');
+    const latinRe = new RegExp(R.chars.latin, 'g');
+    const navRe = new RegExp(R.nav, 'i');
+    const skipRe = new RegExp(R.blocks.skip);
+    const escapeRe = s => s.replace(/[.*+?^${}()|[\\]\\\\]/g, '\\\\$&');
+    // '(?=\\n?$)' is Python's '$', so the cut is the same as text_cleaning.strip_boilerplate
+    const tailRes = R.clean.tail.map(([m, w]) => new RegExp(escapeRe(m) + '[\\\\s\\\\S]{0,' + w + '}(?=\\n?$)', R.clean.tail_ignore_case ? 'i' : ''));
 
     function hebrewRatio(text) {
         if (!text || text.length === 0) return 0;
-        return (text.match(/[\\u0590-\\u05FF\\uFB1D-\\uFB4F]/g) || []).length / text.length;
+        return (text.match(hebrewRe) || []).length / text.length;
     }
     function latinRatio(text) {
         if (!text || text.length === 0) return 0;
-        return (text.match(/[a-zA-Z\\u00C0-\\u024F]/g) || []).length / text.length;
+        return (text.match(latinRe) || []).length / text.length;
     }
     function isNavContent(text) {
-        return /S'abonner|Connexion|sélectionner un pays|Trouver un centre|Magazine|Afrique du Sud|Allemagne|Andorre/i.test(text);
+        return navRe.test(text);
     }
     function isBoilerplate(text) {
         // Only flag as boilerplate if the MAJORITY of the text is boilerplate (short text with boilerplate markers)
-        const markers = ['forthcoming English Chumash','Chabad House Publications','Lessons In Tanya',"Plus d'options d'abonnement",'email_placeholder','Nous ne communiquerons pas'];
-        const hits = markers.filter(m => text.includes(m)).length;
-        return hits >= 2 && text.length < 300;
+        const b = R.boilerplate;
+        return text.length < b.max_len && b.markers.filter(m => text.includes(m)).length >= b.min_hits;
     }
     function stripBoilerplate(text) {
-        return text
-            .replace(/Lessons In Tanya[\\s\\S]{0,200}$/i, '')
-            .replace(/forthcoming English Chumash[\\s\\S]{0,200}$/i, '')
-            .replace(/Chabad House Publications[\\s\\S]{0,200}$/i, '')
-            .replace(/Plus d'options d'abonnement[\\s\\S]{0,200}$/i, '')
-            .replace(/Nous ne communiquerons pas[\\s\\S]{0,200}$/i, '')
-            .replace(/email_placeholder[\\s\\S]{0,200}$/i, '')
-            .replace(/S'abonner[\\s\\S]{0,100}$/i, '')
-            .replace(/Restez connect[\\s\\S]{0,200}$/i, '')
-            .trim();
+        for (const re of tailRes) text = text.replace(re, '');
+        return text.trim();
+    }
+    function accepts(tier, text) {
+        if (text.length <= tier.min_len || isNavContent(text) || isBoilerplate(text)) return false;
+        if (tier.hebrew_min !== undefined && hebrewRatio(text) > tier.hebrew_min) return true;
+        return latinRatio(text) > tier.latin_min;
     }
 
-    // Tanya-specific selectors (may contain Hebrew + French)
-    const tanyaSelectors = ['.js-tanya-body', '#ContentBody .co_body.article-body', '#ContentBody'];
-    for (const sel of tanyaSelectors) {
-        const el = document.querySelector(sel);
-        if (!el) continue;
-        const text = el.innerText.trim();
-        if (text.length > 100 && !isNavContent(text) && !isBoilerplate(text)) {
-            const hr = hebrewRatio(text);
-            const lr = latinRatio(text);
-            if (hr > 0.05 || lr > 0.1) {
-                return { text: stripBoilerplate(text), method: 'tanya-selector:' + sel, hebrew: hr, latin: lr };
+    const tiers = (R.studies[study] || R.studies.default).map(name => R.tiers[name]);
+    for (const tier of tiers) {
+        for (const sel of tier.selectors) {
+            const el = document.querySelector(sel);
+            if (!el) continue;
+            const text = el.innerText.trim();
+            if (accepts(tier, text)) {
+                return done({ text: stripBoilerplate(text), method: tier.method + ':' + sel,
+                              hebrew: hebrewRatio(text), latin: latinRatio(text), rules: R.version });
             }
         }
     }
 
-    const selectors = [
-        '#TextContent', '#textContent', '.article-text',
-        '.page-text-content', '#contentArea', '#pageTextArea',
-        '.entry-content', '#article-body', '.article-body',
-        '.article_body', '#article', '.parsha-content',
-        '#ContentPlaceHolder_TextContent', '.content-inner'
-    ];
-    for (const sel of selectors) {
-        const el = document.querySelector(sel);
-        if (!el) continue;
-        const text = el.innerText.trim();
-        if (text.length > 50 && latinRatio(text) > 0.3 && !isNavContent(text) && !isBoilerplate(text)) {
-            return { text: stripBoilerplate(text), method: 'selector-fr:' + sel };
+    // Largest block. One bottom-up pass over the DOM, without layout, gives every
+    // element its textContent size, its link text and its letter counts. innerText
+    // is then read only for the largest candidates, in decreasing order of an upper
+    // bound of their innerText length (whitespace only collapses, and each element
+    // adds at most 4 line breaks), until no remaining one can win.
+    const B = R.blocks;
+    const tags = new Set(B.tags);
+    const nodes = document.getElementsByTagName('*');
+    const info = new Map();
+    const candidates = [];
+    for (let i = nodes.length - 1; i >= 0; i--) {
+        const el = nodes[i];
+        let size = 0, elems = 0, link = 0, latin = 0, hebrew = 0;
+        for (const child of el.childNodes) {
+            if (child.nodeType === 3) {
+                const t = child.data;
+                size += t.length;
+                latin += (t.match(latinRe) || []).length;
+                hebrew += (t.match(hebrewRe) || []).length;
+            } else if (child.nodeType === 1) {
+                const c = info.get(child);
+                size += c.size; elems += c.elems + 1; link += c.link;
+                latin += c.latin; hebrew += c.hebrew;
+                // textContent, whitespace collapsed as innerText would: no layout in this pass
+                if (child.localName === 'a') link += child.textContent.replace(/\\s+/g, ' ').trim().length;
+            }
         }
+        const rec = { size, elems, link, latin, hebrew };
+        info.set(el, rec);
+        if (tags.has(el.localName)) candidates.push({ el, index: i, rec, bound: size + 4 * elems });
     }
+    candidates.sort((a, b) => b.bound - a.bound || a.index - b.index);
 
+    // Same choice as a scan of every block in document order: the longest wins,
+    // the first one on ties, only blocks longer than min_len can be returned
+    const wins = (b, best) => !best || b.len > best.len || (b.len === best.len && b.index < best.index);
+    const frenchLetters = B.latin_min * B.min_len;  // fewer Latin letters: cannot be French
     const allBlocks = [];
-    const candidates = document.querySelectorAll('div, td, section, main, article, p');
-    for (const el of candidates) {
-        const cls = (el.className || '').toLowerCase();
-        const id = (el.id || '').toLowerCase();
-        if (/nav|footer|header|menu|sidebar|cookie|banner|popup|modal|search|breadcrumb/.test(cls + ' ' + id)) continue;
-        const text = el.innerText || '';
-        const trimmed = text.trim();
+    let bestFr = null, bestAny = null;
+    for (const c of candidates) {
+        if (c.bound <= B.min_len || (bestFr && c.bound < bestFr.len)) break;
+        if (bestAny && c.bound < bestAny.len && c.rec.latin <= frenchLetters) continue;
+        const cls = (c.el.className || '').toLowerCase();
+        const id = (c.el.id || '').toLowerCase();
+        if (skipRe.test(cls + ' ' + id)) continue;
+        const trimmed = (c.el.innerText || '').trim();
         if (trimmed.length < 50) continue;
-        const links = el.querySelectorAll('a');
-        const linkText = Array.from(links).reduce((s, a) => s + (a.innerText || '').length, 0);
-        if (trimmed.length > 0 && linkText / trimmed.length > 0.3) continue;
-        allBlocks.push({
-            text: trimmed, len: trimmed.length,
+        if (c.rec.link / trimmed.length > B.max_link_ratio) continue;
+        const b = {
+            text: trimmed, len: trimmed.length, index: c.index,
             latin: latinRatio(trimmed), hebrew: hebrewRatio(trimmed),
-            isNav: isNavContent(trimmed), isBoiler: isBoilerplate(trimmed), tag: el.tagName
-        });
+            isNav: isNavContent(trimmed), isBoiler: isBoilerplate(trimmed), tag: c.el.tagName
+        };
+        allBlocks.push(b);
+        if (b.isNav || b.isBoiler || b.len >= B.max_len || b.len <= B.min_len) continue;
+        if (b.latin > B.latin_min && wins(b, bestFr)) bestFr = b;
+        if (wins(b, bestAny)) bestAny = b;
     }
 
     // PRIORITY 1: largest French block (not boilerplate)
-    let bestFr = null, bestFrLen = 0;
-    for (const b of allBlocks) {
-        if (b.latin > 0.3 && !b.isNav && !b.isBoiler && b.len > bestFrLen && b.len < 50000) {
-            bestFr = b; bestFrLen = b.len;
-        }
-    }
-    if (bestFr && bestFrLen > 100) {
-        return { text: stripBoilerplate(bestFr.text), method: 'largest-french', latin: bestFr.latin, hebrew: bestFr.hebrew, len: bestFrLen };
+    if (bestFr) {
+        return done({ text: stripBoilerplate(bestFr.text), method: 'largest-french', latin: bestFr.latin, hebrew: bestFr.hebrew, len: bestFr.len, rules: R.version });
     }
 
     // PRIORITY 2: any non-nav, non-boilerplate block
-    let bestAny = null, bestAnyLen = 0;
-    for (const b of allBlocks) {
-        if (!b.isNav && !b.isBoiler && b.len > bestAnyLen && b.len < 50000) {
-            bestAny = b; bestAnyLen = b.len;
-        }
-    }
-    if (bestAny && bestAnyLen > 100) {
-        return { text: stripBoilerplate(bestAny.text), method: 'largest-any', latin: bestAny.latin, hebrew: bestAny.hebrew, len: bestAnyLen };
+    if (bestAny) {
+        return done({ text: stripBoilerplate(bestAny.text), method: 'largest-any', latin: bestAny.latin, hebrew: bestAny.hebrew, len: bestAny.len, rules: R.version });
     }
 
-    return { text: '', method: 'none', debug: allBlocks.slice(0,5).map(b => ({len:b.len, lat:b.latin.toFixed(2), heb:b.hebrew.toFixed(2), nav:b.isNav, boiler:b.isBoiler, preview:b.text.substring(0,80)})) };
+    allBlocks.sort((a, b) => a.index - b.index);
+    return done({ text: '', method: 'none', rules: R.version, debug: allBlocks.slice(0,5).map(b => ({len:b.len, lat:b.latin.toFixed(2), heb:b.hebrew.toFixed(2), nav:b.isNav, boiler:b.isBoiler, preview:b.text.substring(0,80)})) });
+}
+""".replace('__RULES__', json.dumps(RULES, ensure_ascii=False))
+
+# Resolves as soon as one of the EXTRACT_JS selectors holds real text.
+# Pages where only the largest-block fallback works resolve shortly after `load`.
+READY_JS = """
+([selectors, minLen, graceMs, reject]) => {
+    for (const sel of selectors) {
+        const el = document.querySelector(sel);
+        if (!el) continue;
+        const text = (el.textContent || '').trim();
+        if (text.length > minLen && !text.includes(reject)) return sel;
+    }
+    const nav = performance.getEntriesByType('navigation')[0];
+    if (nav && nav.loadEventEnd > 0 && performance.now() - nav.loadEventEnd > graceMs) return 'load';
+    return false;
 }
 """
 
 
+def _is_challenge_title(title):
+    title = title.lower()
+    return 'moment' in title or 'challenge' in title or 'attention' in title
+
+def _study_url(page_path, target_date):
+    sep = '&' if '?' in page_path else '?'
+    tdate = "%d/%d/%d" % (target_date.month, target_date.day, target_date.year)
+    return "%s/%s%stdate=%s" % (BASE_URL, page_path, sep, tdate)
+
+def _clean_title(title):
+    return re.sub(r'\s*-\s*fr\.chabad\.org.*', '', title, flags=re.IGNORECASE).strip()
+
+def _is_challenge_response(status_code, html):
+    return 'Just a moment' in html[:500] or status_code == 403
+
+def _html_title(html):
+    m = re.search(r'<title[^>]*>([^<]+)</title>', html, re.IGNORECASE)
+    return _clean_title(m.group(1)) if m else ''
+
 def wait_for_cloudflare(page, max_wait=60):
     """Wait for Cloudflare challenge to resolve."""
     for _w in range(max_wait // 2):
-        title = page.title()
-        if 'moment' not in title.lower() and 'challenge' not in title.lower() and 'attention' not in title.lower():
+        if not _is_challenge_title(page.title()):
             return True
         if _w % 5 == 0:
             print("  Cloudflare... (%ds)" % ((_w+1)*2))
@@ -228,6 +376,249 @@ def wait_for_cloudflare(page, max_wait=60):
     return False
 
 
+class ResourceFilter:
+    """page.route allowlist: the document, first-party/challenge scripts and XHRs.
+
+    Set `study` before each navigation so RESOURCE_ALLOW applies per study.
+    Counts blocked requests by type and bytes actually received, see report().
+    """
+
+    def __init__(self, study="warmup"):
+        self.study = study
+        self.blocked = {}
+        self.allowed = 0
+        self.bytes_in = 0
+
+    def allows(self, request):
+        if request.url.startswith("data:") or "/cdn-cgi/" in request.url:
+            return True
+        types = RESOURCE_ALLOW.get(self.study)
+        if types is None:
+            return True
+        host = (urlsplit(request.url).hostname or "").lower()
+        if not any(host == h or host.endswith("." + h) for h in RESOURCE_HOSTS):
+            return False
+        return request.resource_type in types
+
+    def _decide(self, route):
+        if self.allows(route.request):
+            self.allowed += 1
+            return True
+        rtype = route.request.resource_type
+        self.blocked[rtype] = self.blocked.get(rtype, 0) + 1
+        return False
+
+    def handle(self, route):
+        if self._decide(route):
+            route.continue_()
+        else:
+            route.abort()
+
+    async def handle_async(self, route):
+        if self._decide(route):
+            await route.continue_()
+        else:
+            await route.abort()
+
+    def on_response(self, response):
+        try:
+            n = int(response.headers.get("content-length", 0))
+        except ValueError:
+            return
+        self.bytes_in += n
+        METRICS.add_bytes("browser", n)
+
+    def install(self, page):
+        """Sync API: attach to a page."""
+        if BLOCK_RESOURCES:
+            page.route("**/*", self.handle)
+        page.on("response", self.on_response)
+        return self
+
+    async def install_async(self, page):
+        if BLOCK_RESOURCES:
+            await page.route("**/*", self.handle_async)
+        page.on("response", self.on_response)
+        return self
+
+    @staticmethod
+    def report(filters):
+        """Print requests/bytes saved over one or more filters (one per page)."""
+        blocked, allowed, bytes_in = {}, 0, 0
+        for f in filters:
+            allowed += f.allowed
+            bytes_in += f.bytes_in
+            for rtype, n in f.blocked.items():
+                blocked[rtype] = blocked.get(rtype, 0) + n
+        n_blocked = sum(blocked.values())
+        saved = sum(RESOURCE_EST_BYTES.get(t, 5000) * n for t, n in blocked.items())
+        detail = ", ".join("%s %d" % (t, n) for t, n in sorted(blocked.items(), key=lambda kv: -kv[1]))
+        print("[filter] blocked %d/%d requests (%s), ~%.1f MB saved, %.1f MB downloaded" % (
+            n_blocked, n_blocked + allowed, detail or "-", saved / 1e6, bytes_in / 1e6))
+
+
+def _ready_args(study):
+    ready = RULES['ready']
+    sels = [sel for _name, tier in study_tiers(study, ready['studies']) for sel in tier['selectors']]
+    return [sels, ready['min_len'], READY_LOAD_GRACE, ready['reject']]
+
+def wait_for_content(page, study, t0=None):
+    """Wait until the study content is in the DOM.
+    Returns (matched selector or None, ms since t0)."""
+    t0 = t0 or time.monotonic()
+    with METRICS.timer(study, 'ready'):
+        try:
+            handle = page.wait_for_function(READY_JS, arg=_ready_args(study),
+                                            timeout=READY_TIMEOUT.get(study, 15000), polling=100)
+            ready = handle.json_value()
+        except Exception:
+            ready = None
+    return ready, (time.monotonic() - t0) * 1000
+
+def goto_ready(page, url, study, filt=None):
+    """domcontentloaded navigation + Cloudflare check + content readiness.
+    Returns (ok, ready, ms) - ok is False when stuck on Cloudflare."""
+    if filt:
+        filt.study = study
+    t0 = time.monotonic()
+    with METRICS.timer(study, 'goto'):
+        page.goto(url, wait_until="domcontentloaded", timeout=90000)
+    with METRICS.timer(study, 'cloudflare'):
+        ok = wait_for_cloudflare(page, max_wait=30 if study == 'tanya' else 20)
+    if not ok:
+        METRICS.count('challenge', study)
+        return False, None, (time.monotonic() - t0) * 1000
+    ready, ms = wait_for_content(page, study, t0)
+    print("    ready=%s in %dms" % (ready or 'timeout', ms))
+    return True, ready, ms
+
+def warmup(page, max_wait=60, filt=None):
+    """Visit the daily study index once so Cloudflare sets its cookies."""
+    if filt:
+        filt.study = "warmup"
+    with METRICS.timer("warmup", 'goto'):
+        page.goto(WARMUP_URL, wait_until="domcontentloaded", timeout=90000)
+    with METRICS.timer("warmup", 'cloudflare'):
+        ok = wait_for_cloudflare(page, max_wait=max_wait)
+    if ok:
+        try:
+            page.wait_for_load_state("load", timeout=15000)
+        except Exception:
+            pass
+    else:
+        METRICS.count('challenge', "warmup")
+    return ok
+
+def _extract_timing(study, result, t0):
+    """Per page: round trip of page.evaluate and time spent inside EXTRACT_JS."""
+    ms = (time.monotonic() - t0) * 1000
+    METRICS.observe(study, 'evaluate', ms)
+    METRICS.observe(study, 'extract_js', result.get('ms', 0))
+    print("    extract=%s in %dms (evaluate %dms)" % (result.get('method'), result.get('ms', 0), ms))
+
+def extract_page(page, study):
+    """page.evaluate(EXTRACT_JS), timed."""
+    t0 = time.monotonic()
+    result = page.evaluate(EXTRACT_JS, study)
+    _extract_timing(study, result, t0)
+    return result
+
+class BrowserState:
+    """Saved storage_state (Cloudflare cookies) for one user agent, in STATE_DIR.
+
+    cf_clearance is tied to the user agent, so there is one file per UA.
+    `restored` is True when the context was built from a still-valid state
+    and the warm-up can be skipped; invalidate() forces a fresh warm-up.
+    """
+
+    def __init__(self, user_agent):
+        self.user_agent = user_agent
+        self.path = None
+        self.state = None
+        if STATE_DIR:
+            digest = hashlib.sha1(user_agent.encode('utf-8')).hexdigest()[:12]
+            self.path = Path(STATE_DIR) / ("cf-%s.json" % digest)
+            self.state = self._load()
+        self.restored = self.state is not None
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        now = time.time()
+        if saved.get('user_agent') != self.user_agent:
+            return None
+        if now - saved.get('saved', 0) > STATE_MAX_AGE:
+            print("  [state] %s too old, warm-up needed" % self.path.name)
+            return None
+        state = saved.get('state') or {}
+        clearance = [c for c in state.get('cookies', []) if c.get('name') == 'cf_clearance']
+        if not clearance:
+            return None
+        expires = clearance[0].get('expires', -1)
+        if expires > 0 and expires < now + STATE_MIN_TTL:
+            print("  [state] cf_clearance expires in %ds, warm-up needed" % (expires - now))
+            return None
+        return state
+
+    def context_options(self):
+        opts = {'user_agent': self.user_agent, 'locale': "fr-FR"}
+        if self.state:
+            opts['storage_state'] = self.state
+        return opts
+
+    def save(self, state):
+        self.state = state  # also kept in memory for the next context of this run
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'user_agent': self.user_agent, 'saved': time.time(), 'state': state}, f)
+        tmp.replace(self.path)
+        print("  [state] saved %s" % self.path)
+
+    def reopen(self):
+        """Before a new context for this UA: restored if a clearance was saved meanwhile."""
+        self.restored = self.state is not None
+
+    def invalidate(self):
+        """Challenge came back: drop the saved state so the next start warms up again."""
+        self.restored = False
+        self.state = None
+        if self.path and self.path.exists():
+            self.path.unlink()
+            print("  [state] %s dropped" % self.path.name)
+
+
+def ensure_clearance(page, context, bstate, filt=None, max_wait=60):
+    """Warm-up, unless the context was restored from a valid saved state.
+    Saves the state after a successful warm-up."""
+    if bstate.restored:
+        print("  Cloudflare state restored, warm-up skipped")
+        return True
+    ok = warmup(page, max_wait=max_wait, filt=filt)
+    if ok:
+        bstate.save(context.storage_state())
+    return ok
+
+def refresh_clearance(page, context, bstate, filt=None, max_wait=60):
+    print("  Challenge with a restored state, warming up again...")
+    bstate.invalidate()
+    return ensure_clearance(page, context, bstate, filt, max_wait)
+
+def goto_ready_refresh(page, context, bstate, url, study, filt=None):
+    """goto_ready, retried once after a fresh warm-up when a restored state got challenged."""
+    ok, ready, ms = goto_ready(page, url, study, filt)
+    if not ok and bstate.restored:
+        METRICS.count('rewarm', study)
+        refresh_clearance(page, context, bstate, filt)
+        ok, ready, ms = goto_ready(page, url, study, filt)
+    return ok, ready, ms
+
+
 def scrape_playwright(target_date):
     m, d, y = target_date.month, target_date.day, target_date.year
     tdate = "%d/%d/%d" % (m, d, y)
@@ -236,24 +627,20 @@ def scrape_playwright(target_date):
     with sync_playwright() as p:
         print("Launching Chromium...")
         browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            locale="fr-FR",
-        )
+        bstate = BrowserState(DEFAULT_UA)
+        context = browser.new_context(**bstate.context_options())
         page = context.new_page()
+        filt = ResourceFilter().install(page)
 
         # === WARM-UP: visit fr.chabad.org to solve Cloudflare challenge first ===
         print("Warm-up: solving Cloudflare on fr.chabad.org...")
         try:
-            page.goto("https://fr.chabad.org/dailystudy/", wait_until="networkidle", timeout=90000)
-            if wait_for_cloudflare(page, max_wait=60):
+            if ensure_clearance(page, context, bstate, filt):
                 print("  Cloudflare resolved! Cookies set.")
             else:
                 print("  Warning: Cloudflare may not be fully resolved")
-            time.sleep(3)
         except Exception as e:
             print("  Warm-up error: %s (continuing anyway)" % str(e))
-            time.sleep(3)
 
         # === Now scrape each study page (cookies already set) ===
         for study, page_path in PAGES.items():
@@ -261,21 +648,21 @@ def scrape_playwright(target_date):
             url = "%s/%s%stdate=%s" % (BASE_URL, page_path, sep, tdate)
             print("Fetching %s: %s" % (study, url))
             try:
-                page.goto(url, wait_until="networkidle", timeout=90000)
-
-                # Short wait for any remaining challenge
-                if not wait_for_cloudflare(page, max_wait=20):
+                ok, _ready, _ms = goto_ready_refresh(page, context, bstate, url, study, filt)
+                if not ok:
                     print("  x %s: stuck on Cloudflare" % study)
-                    time.sleep(DELAY); continue
+                    METRICS.page(study, 'challenge')
+                    METRICS.sleep(DELAY, study); continue
 
-                time.sleep(2)
-
-                result = page.evaluate(EXTRACT_JS)
+                if ARCHIVE_DIR:
+                    archive_page(url, study, _data_key(study, target_date), page.content())
+                result = extract_page(page, study)
                 text = result.get('text', '')
                 method = result.get('method', '')
 
                 if method == 'none':
                     debug = result.get('debug', [])
+                    METRICS.page(study, 'empty', method)
                     print("  x %s: no content. Debug:" % study)
                     for d_item in debug:
                         print("    %s" % d_item)
@@ -285,61 +672,25 @@ def scrape_playwright(target_date):
                     latin = result.get('latin', 0)
                     hebrew = result.get('hebrew', 0)
                     results[study] = {'text': text, 'title': clean_title}
+                    METRICS.page(study, 'ok', method)
                     print("  OK %s: %d chars [%s] lat=%.0f%% heb=%.0f%% - %s" % (
                         study, len(text), method, latin*100, hebrew*100, clean_title[:60]))
                 else:
+                    METRICS.page(study, 'empty', method)
                     print("  x %s: empty (method=%s)" % (study, method))
 
             except Exception as e:
+                METRICS.page(study, 'error')
                 print("  x %s: %s" % (study, str(e)))
-            time.sleep(DELAY)
+            METRICS.sleep(DELAY, study)
 
         browser.close()
+    ResourceFilter.report([filt])
     return results
 
 
 # --- Cloudscraper engine (Mac local) ---
 
-def is_french_text(text):
-    if not text: return False
-    latin = len(re.findall(r'[a-zA-Z\u00C0-\u024F]', text))
-    return latin / max(len(text), 1) > 0.3
-
-def is_nav_text(text):
-    return bool(re.search(r"S'abonner|Connexion|sélectionner un pays|Trouver un centre|Afrique du Sud|Allemagne|Andorre", text, re.IGNORECASE))
-
-def extract_text_bs(html):
-    soup = BeautifulSoup(html, 'html.parser')
-    for tag in soup.find_all(['script','style','nav','header','footer']):
-        tag.decompose()
-    selectors = [
-        '#TextContent','#textContent','.article-text','.page-text-content',
-        '#contentArea','#pageTextArea','.entry-content','#article-body',
-        '.article-body','.article_body','#article','.parsha-content',
-        '#ContentPlaceHolder_TextContent','.content-inner'
-    ]
-    for sel in selectors:
-        el = soup.select_one(sel)
-        if el:
-            text = re.sub(r'\s+', ' ', el.get_text(separator=' ', strip=True)).strip()
-            if len(text) > 50 and is_french_text(text) and not is_nav_text(text):
-                return text
-    best, best_len = None, 0
-    for div in soup.find_all(['div','td','section','main']):
-        cls = ' '.join(div.get('class', [])).lower()
-        if any(x in cls for x in ('nav','footer','header','menu','sidebar')): continue
-        links = div.find_all('a')
-        link_text = sum(len(a.get_text(strip=True)) for a in links)
-        txt = div.get_text(strip=True)
-        if len(txt) > 0 and link_text / len(txt) > 0.3: continue
-        if not is_french_text(txt): continue
-        if is_nav_text(txt): continue
-        if 100 < len(txt) < 50000 and len(txt) > best_len:
-            best = div; best_len = len(txt)
-    if best:
-        return re.sub(r'\s+', ' ', best.get_text(separator=' ', strip=True)).strip()
-    return None
-
 def scrape_cloudscraper(target_date):
     m, d, y = target_date.month, target_date.day, target_date.year
     tdate = "%d/%d/%d" % (m, d, y)
@@ -351,357 +702,1484 @@ def scrape_cloudscraper(target_date):
         url = "%s/%s%stdate=%s" % (BASE_URL, page_path, sep, tdate)
         print("Fetching %s: %s" % (study, url))
         for attempt in range(3):
+            if attempt:
+                METRICS.count('retry', study)
             try:
-                r = scraper.get(url, timeout=30)
-                if 'Just a moment' in r.text[:500] or r.status_code == 403:
+                with METRICS.timer(study, 'get'):
+                    r = scraper.get(url, timeout=30)
+                METRICS.add_bytes('cloudscraper', len(r.content))
+                if _is_challenge_response(r.status_code, r.text):
                     print("  Attempt %d: Cloudflare (status %d)" % (attempt+1, r.status_code))
-                    time.sleep(5); continue
+                    METRICS.count('challenge', study)
+                    METRICS.sleep(5, study); continue
                 r.raise_for_status()
-                text = extract_text_bs(r.text)
+                archive_page(url, study, _data_key(study, target_date), r.text)
+                with METRICS.timer(study, 'extract'):
+                    text = extract_text_bs(r.text, study=study)
                 if text and len(text) > 50:
-                    title_match = re.search(r'<title[^>]*>([^<]+)</title>', r.text, re.IGNORECASE)
-                    title = title_match.group(1) if title_match else ''
-                    title = re.sub(r'\s*-\s*fr\.chabad\.org.*', '', title, flags=re.IGNORECASE).strip()
+                    title = _html_title(r.text)
                     results[study] = {'text': text, 'title': title}
+                    METRICS.page(study, 'ok', html_extract.HTML_PARSER)
                     print("  OK %s: %d chars - %s" % (study, len(text), title[:60]))
                 else:
+                    METRICS.page(study, 'empty')
                     print("  x %s: no French content" % study)
                 break
             except Exception as e:
                 print("  Attempt %d: %s" % (attempt+1, str(e)))
-                time.sleep(3)
-        time.sleep(DELAY)
+                METRICS.sleep(3, study)
+        else:
+            METRICS.page(study, 'error')
+        METRICS.sleep(DELAY, study)
     return results
 
 
+# --- Hybrid HTTP engine (bulk modes) ---
+
+class HttpFetcher:
+    """Keep-alive HTTP client reusing the cf_clearance cookie of a warmed-up browser,
+    or, given a cloudscraper `session`, solving the challenges without a browser.
+
+    fetch() returns {'text', 'title'} or None when the page must go through another
+    engine (challenge, HTTP error, nothing extracted). With the validators of a
+    stored entry ('etag', 'modified') the GET is conditional and a 304 returns
+    {'unchanged': True}. Every outcome goes to ENGINES under `engine`, whose
+    breaker stops sending a study here after repeated challenges.
+    """
+
+    def __init__(self, cookies, user_agent, pool_size=CONCURRENCY, session=None, engine='http'):
+        self.engine = engine
+        if session is None:
+            self.session = requests.Session()
+            self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1)))
+            self.session.headers.update({
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "fr-FR,fr;q=0.9",
+            })
+        else:
+            # cloudscraper: its CipherSuiteAdapter (TLS ciphers / ECDH curve are what
+            # gets past Cloudflare) and browser headers are left as they are. Its pool
+            # keeps 10 connections per host, above CONCURRENCY.
+            self.session = session
+        if user_agent:
+            self.session.headers["User-Agent"] = user_agent
+        for c in cookies or []:
+            self.session.cookies.set(c["name"], c["value"], domain=c.get("domain"), path=c.get("path", "/"))
+        self.has_clearance = any(c["name"] == "cf_clearance" for c in cookies or [])
+        self.challenges = 0
+        self.fetched = 0
+        self.fallbacks = 0
+        self.parse_ms = 0.0
+        self.extract_ms = 0.0
+        self.parsed = 0
+
+    def handles(self, study):
+        return study in HTTP_STUDIES
+
+    def fetch(self, url, study=None, validators=None):
+        headers = {}
+        if validators and validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators and validators.get('modified'):
+            headers['If-Modified-Since'] = validators['modified']
+        t0 = time.monotonic()
+        try:
+            with METRICS.timer(study, self.engine):
+                r = self.session.get(url, timeout=30, headers=headers)
+        except Exception as e:
+            print("    [%s] %s -> next engine" % (self.engine, str(e)))
+            return self._fallback(study, 'error', t0)
+        METRICS.add_bytes(self.engine, len(r.content))
+        if _is_challenge_response(r.status_code, r.text):
+            self.challenges += 1
+            METRICS.count('challenge', study)
+            print("    [%s] Cloudflare (status %d) -> next engine" % (self.engine, r.status_code))
+            return self._fallback(study, 'challenge', t0)
+        if r.status_code == 304 and headers:
+            self.fetched += 1
+            ENGINES.record(study, self.engine, 'ok', (time.monotonic() - t0) * 1000)
+            return {'unchanged': True, 'method': '%s-304' % self.engine}
+        text = None
+        if r.ok:
+            timing = {}
+            text = extract_text_bs(r.text, keep_lines=True, study=study, timing=timing)
+            self.parse_ms += timing['parse_ms']
+            self.extract_ms += timing['extract_ms']
+            self.parsed += 1
+            METRICS.observe(study, 'parse', timing['parse_ms'])
+            METRICS.observe(study, 'extract', timing['extract_ms'])
+        if not text or len(text) <= 50:
+            print("    [%s] status %d, no content -> next engine" % (self.engine, r.status_code))
+            return self._fallback(study, 'empty', t0)
+        self.fetched += 1
+        ENGINES.record(study, self.engine, 'ok', (time.monotonic() - t0) * 1000)
+        result = {'text': text, 'title': _html_title(r.text), 'rules': RULES_VERSION, 'method': self.engine,
+                  'etag': r.headers.get('ETag'), 'modified': r.headers.get('Last-Modified')}
+        if ARCHIVE_DIR:
+            result['html'] = r.text
+        return result
+
+    def _fallback(self, study, outcome, t0):
+        self.fallbacks += 1
+        METRICS.count('%s_fallback' % self.engine, study)
+        ENGINES.record(study, self.engine, outcome, (time.monotonic() - t0) * 1000)
+        return None
+
+    def report(self):
+        print("[%s] %d pages, %d sent to the next engine" % (self.engine, self.fetched, self.fallbacks))
+        if self.parsed:
+            print("[%s] %s: parse %.1f ms, extract %.1f ms per page" % (
+                self.engine, html_extract.HTML_PARSER, self.parse_ms / self.parsed, self.extract_ms / self.parsed))
+
+    def close(self):
+        self.session.close()
+
+
+def _http_fetcher(cookies, user_agent):
+    """HttpFetcher for the bulk modes, or None if disabled / no clearance cookie."""
+    if not (USE_HTTP and HYBRID_HTTP):
+        return None
+    fetcher = HttpFetcher(cookies, user_agent)
+    if not fetcher.has_clearance:
+        print("  [http] no cf_clearance cookie, trying HTTP anyway")
+    return fetcher
+
+def _fetchers(cookies, user_agent):
+    """The HTTP-side engines of the bulk modes, cheapest first: clearance cookies, cloudscraper."""
+    fetchers = []
+    fetcher = _http_fetcher(cookies, user_agent)
+    if fetcher:
+        fetchers.append(fetcher)
+    if USE_CLOUDSCRAPER and HYBRID_HTTP:
+        scraper = cloudscraper.create_scraper(browser={'browser': 'chrome', 'platform': 'darwin', 'desktop': True}, delay=10)
+        fetchers.append(HttpFetcher(None, None, session=scraper, engine='cloudscraper'))
+    return fetchers
+
+def _engines_state(save=False):
+    """Breakers kept across runs in STATE_DIR (engine_router)."""
+    if not STATE_DIR:
+        return
+    path = os.path.join(STATE_DIR, 'engines.json')
+    if save:
+        ENGINES.save(path)
+    else:
+        ENGINES.load(path)
+
+
 # --- Data file management ---
 
-def load_data():
-    if DATA_FILE.exists():
+_baseline = None     # data as loaded, in shard mode only new/changed entries are saved
+_saved_hash = None   # sha1 of DATA_FILE as last read/written, unchanged data is not rewritten
+_load_failed = False # DATA_FILE and its backup unreadable: never overwrite it
+_fragments = {}      # (section, key) -> (value, serialized entry) for _dump_data
+_store = None        # StudyStore on STORE_FILE, opened by the first load_data
+
+def _sibling(path, suffix):
+    return path.with_name(path.name + suffix)
+
+def _sha1(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def _atomic_write(path, text, backup=None):
+    """Write to path.tmp, fsync, then rename over path. The previous file is
+    kept as `backup` (hard link, so there is never a moment without path)."""
+    tmp = _sibling(path, '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    if backup and path.exists():
+        if backup.exists():
+            backup.unlink()
         try:
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except: pass
-    return {'hayom_yom':{}, 'rambam':{}, 'tanya':{}, 'houmash':{}}
+            os.link(path, backup)
+        except OSError:
+            shutil.copy2(path, backup)
+    os.replace(tmp, path)
+
+def _dump_data(data):
+    """Same text as json.dumps(data, ensure_ascii=False, indent=2), but entries
+    unchanged since the previous call reuse their serialized text."""
+    if not data:
+        return '{}'
+    sections = []
+    for section, entries in data.items():
+        name = json.dumps(section, ensure_ascii=False)
+        if not isinstance(entries, dict) or not entries:
+            body = json.dumps(entries, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+            sections.append('  %s: %s' % (name, body))
+            continue
+        lines = []
+        for key, value in entries.items():
+            cached = _fragments.get((section, key))
+            if cached is None or cached[0] != value:
+                body = json.dumps(value, ensure_ascii=False, indent=2).replace('\n', '\n    ')
+                cached = (copy.copy(value), '    %s: %s' % (json.dumps(key, ensure_ascii=False), body))
+                _fragments[(section, key)] = cached
+            lines.append(cached[1])
+        sections.append('  %s: {\n%s\n  }' % (name, ',\n'.join(lines)))
+    return '{\n' + ',\n'.join(sections) + '\n}'
+
+def _open_store():
+    global _store
+    if _store is None and STORE_FILE:
+        _store = StudyStore(STORE_FILE)
+    return _store
+
+def load_data(read_only=False):
+    """The data, through the SQLite store when STORE_FILE is set: loaded from the
+    store when DATA_FILE is its last export, else DATA_FILE is imported into it
+    (first run, DATA_FILE updated by git). DATA_FILE unreadable: the store, else
+    the .bak generation, else start empty; save_data then refuses to overwrite it.
+    read_only (plan, stats): an existing store is only read, never created nor
+    imported into; it is used only while DATA_FILE is its last export."""
+    global _baseline, _saved_hash, _load_failed, _store
+    data = None
+    _saved_hash, _load_failed = None, False
+    if read_only:
+        store = StudyStore(STORE_FILE, read_only=True) if STORE_FILE and STORE_FILE.exists() else None
+    else:
+        store = _open_store()
+    backup = _sibling(DATA_FILE, '.bak')
+    for path in (DATA_FILE, backup):
+        if not path.exists():
+            continue
+        if path == backup and store and store.count():
+            print("  -> %s used" % STORE_FILE)  # newer than any backup
+            data = store.load()
+            break
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                raw = f.read()
+            digest = _sha1(raw)
+            if store and path == DATA_FILE and digest == store.get_meta('exported'):
+                data = store.load()  # our last export, no JSON parsing
+                if read_only:
+                    _store = store
+            else:
+                data = json.loads(raw)
+                if store and not read_only:
+                    store.sync(data, replace=True)
+                    store.set_meta('exported', digest if path == DATA_FILE else None)
+                    print("[store] %s imported into %s" % (path, STORE_FILE))
+        except (OSError, ValueError) as e:
+            print("Erreur: %s illisible (%s)" % (path, e))
+            _load_failed = True
+            continue
+        if path == DATA_FILE:
+            _saved_hash = digest
+        else:
+            print("  -> backup %s used" % path)
+        _load_failed = False
+        break
+    if data is None:
+        data = store.load() if store else {'hayom_yom':{}, 'rambam':{}, 'tanya':{}, 'houmash':{}}
+    if SHARD:
+        _baseline = copy.deepcopy(data)
+    return data
 
 def save_data(data):
-    with open(DATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    """Changed entries to the store in one transaction, then DATA_FILE and daily/
+    exported from it (keys in insertion order, see StudyStore.load)."""
+    global _saved_hash
+    if SHARD:
+        save_partial(data)
+        return
+    store = _open_store()
+    if store:
+        written, deleted = store.sync(data)
+        if written or deleted:
+            print("\n[store] %d entries written, %d deleted in %s" % (written, deleted, STORE_FILE))
+        data = store.load()
+    text = _dump_data(data)
+    digest = _sha1(text)
+    if digest == _saved_hash:
+        print("\nUnchanged, %s not rewritten" % DATA_FILE)
+        if store:
+            store.set_meta('exported', digest)
+        export_daily(data)
+        return
+    if _load_failed:
+        path = _sibling(DATA_FILE, '.new')
+        _atomic_write(path, text)
+        print("\n%s could not be read, NOT overwritten. Saved to %s" % (DATA_FILE, path))
+        return
+    # No rotation when DATA_FILE did not parse: the .bak it was rebuilt from stays
+    _atomic_write(DATA_FILE, text, backup=_sibling(DATA_FILE, '.bak') if _saved_hash else None)
+    _saved_hash = digest
+    if store:
+        store.set_meta('exported', digest)
     print("\nSaved to %s" % DATA_FILE)
-
-def _clean_scraped_text(text):
-    """Strip known fr.chabad.org boilerplate from scraped text."""
-    if not text:
-        return text
-    # Strip header boilerplate (Rambam/Tanya/Houmash page headers)
-    text = re.sub(r'^Calendrier juif[\s\S]*?Aujourd.hui\s*\n', '', text)
-    # Strip footer: date repetition + navigation
-    text = re.sub(r'\n[A-Za-zÀ-ÿ]+ \d+ [A-Za-zÀ-ÿ]+ \d{4} / \d+ [a-zà-ÿ]+ \d{4}\nAujourd.hui[\s\S]*$', '', text)
-    text = re.sub(r'\nTéléchargez le calendrier[\s\S]*$', '', text)
-    text = re.sub(r'\nAbout the book[\s\S]*$', '', text)
-    text = re.sub(r'\nCette page comporte des textes sacrés[\s\S]*$', '', text)
-    text = re.sub(r'\nEtudes quotidiennes[\s\S]*$', '', text)
-    text = re.sub(r'\nAu sujet de l.éditeur[\s\S]*$', '', text)
-    text = re.sub(r'Lessons In Tanya[\s\S]{0,200}$', '', text)
-    text = re.sub(r'forthcoming English Chumash[\s\S]{0,200}$', '', text)
-    text = re.sub(r'Chabad House Publications[\s\S]{0,200}$', '', text)
-    text = re.sub(r"Plus d'options d'abonnement[\s\S]{0,200}$", '', text)
-    text = re.sub(r"S'abonner[\s\S]{0,100}$", '', text)
-    text = re.sub(r"Restez connecté[\s\S]{0,200}$", '', text)
-    text = re.sub(r"Chaque semaine, dans votre boîte mail[\s\S]{0,200}$", '', text)
-    text = re.sub(r'Kehot Publication Society[\s\S]{0,200}$', '', text)
-    return text.strip()
-
-def _is_garbage_text(text):
-    """Detect garbage text (subscription forms, publisher info, etc)."""
-    if not text or len(text) < 50:
-        return True
-    # Only reject very short texts that are mostly boilerplate
-    garbage_only = [
-        "email_placeholder", "Nous ne communiquerons pas votre adresse"
-    ]
-    for g in garbage_only:
-        if g in text and len(text) < 300:
-            return True
-    # Subscription/Cloudflare interstitial markers — always garbage regardless of length
-    always_garbage = [
-        "Restez connecté avec le meilleur de Chabad.org",
-        "Chaque semaine, dans votre boîte mail",
-    ]
-    for g in always_garbage:
-        if g in text:
-            return True
-    # Short texts with subscription/publisher markers are garbage
-    if len(text) < 300:
-        short_garbage = [
-            "S'abonner", "Plus d'options d'abonnement",
-        ]
-        for g in short_garbage:
-            if g in text:
-                return True
-    footer_markers = ["Au sujet de l'éditeur", "Acheter le livre", "Voir le site", "Kehot Publication Society"]
-    footer_hits = sum(1 for m in footer_markers if m in text)
-    if footer_hits >= 2 and len(text) < 300:
-        return True
-    return False
+    export_daily(data)
+
+def _date_key_iso(date_key):
+    """'2026-3-5' -> '2026-03-05' (file names sort by date)."""
+    y, m, d = (int(x) for x in date_key.split('-'))
+    return "%04d-%02d-%02d" % (y, m, d)
+
+def _public_entry(value):
+    """Entry as exported for the app: without FRESH_FIELDS, which change on refresh."""
+    if not isinstance(value, dict):
+        return value
+    return {k: v for k, v in value.items() if k not in FRESH_FIELDS}
+
+def export_daily(data, out_dir=None):
+    """Sharded copy of data for the app, next to the monolithic DATA_FILE:
+      daily/studies/YYYY-MM-DD.json  the 4 studies of one day (Hayom Yom by its Hebrew key)
+      daily/hayom_yom/<Month>_<day>.json
+      daily/manifest.json            content hash of every file
+    Only files whose hash changed are rewritten, files no longer in data are removed."""
+    out_dir = Path(out_dir) if out_dir else DAILY_DIR
+    if not out_dir:
+        return
+    files = {}
+    date_keys = set()
+    for study in ('rambam', 'tanya', 'houmash'):
+        date_keys.update(data.get(study, {}))
+    for date_key in date_keys:
+        try:
+            iso = _date_key_iso(date_key)
+            y, m, d = (int(x) for x in iso.split('-'))
+            hyy_key = _hyy_key(greg_to_hebrew(y, m, d))
+        except ValueError:
+            continue
+        day = {'date': iso, 'hyy_key': hyy_key}
+        if hyy_key in data.get('hayom_yom', {}):
+            day['hayom_yom'] = data['hayom_yom'][hyy_key]
+        for study in ('rambam', 'tanya', 'houmash'):
+            if date_key in data.get(study, {}):
+                day[study] = _public_entry(data[study][date_key])
+        files['studies/%s.json' % iso] = day
+    for hyy_key, text in data.get('hayom_yom', {}).items():
+        files['hayom_yom/%s.json' % hyy_key] = {'key': hyy_key, 'text': text}
+
+    manifest_path = out_dir / 'manifest.json'
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            old = json.load(f).get('files', {})
+    except (OSError, ValueError):
+        old = {}
+    manifest = {'version': 1, 'files': {}}
+    written = 0
+    for name in sorted(files):
+        text = json.dumps(files[name], ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+        digest = _sha1(text)[:16]
+        manifest['files'][name] = digest
+        path = out_dir / name
+        if old.get(name) != digest or not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _atomic_write(path, text)
+            written += 1
+    removed = 0
+    for name in set(old) - set(files):
+        path = out_dir / name
+        if path.exists():
+            path.unlink()
+            removed += 1
+    if written or removed or not manifest_path.exists():
+        _atomic_write(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=1, sort_keys=True))
+    print("Daily files: %d written, %d removed, %d total in %s" % (written, removed, len(files), out_dir))
+
+def _clean(study, text):
+    """clean_and_classify, timed as the 'clean' stage."""
+    with METRICS.timer(study, 'clean'):
+        return clean_and_classify(text)
 
 def update_data(data, target_date, results):
     y, m, d = target_date.year, target_date.month, target_date.day
     date_key = "%d-%d-%d" % (y, m, d)
     heb = greg_to_hebrew(y, m, d)
-    hyy_key = "%s_%d" % (heb['mName'].replace(' ', '_'), heb['hd'])
+    hyy_key = _hyy_key(heb)
     print("\nKeys: dateKey=%s, hyyKey=%s (%s %d)" % (date_key, hyy_key, heb['mName'], heb['hd']))
     if 'hayom_yom' in results:
-        data['hayom_yom'][hyy_key] = results['hayom_yom']['text']
+        _put_entry(data, 'hayom_yom', hyy_key, results['hayom_yom']['text'])
     for study in ['rambam', 'tanya', 'houmash']:
         if study in results:
-            raw = results[study]['text']
-            cleaned = _clean_scraped_text(raw)
-            if _is_garbage_text(cleaned):
+            cleaned, garbage = _clean(study, results[study]['text'])
+            if garbage:
                 print("  SKIP %s: garbage after cleaning (%d chars)" % (study, len(cleaned)))
                 continue
-            data.setdefault(study, {})[date_key] = {'text': cleaned, 'title': results[study]['title']}
+            _put_entry(data, study, date_key, cleaned, results[study]['title'])
+
+def _put_entry(data, study, key, text, title=None, meta=None):
+    """Store an entry with the version of the rules it was extracted and cleaned with.
+    Hayom Yom entries are plain strings: their version goes to RULES_SECTION.
+    Other entries also get their text hash, fetch time, and the HTTP validators and
+    extraction method found in `meta` (a fetch result, or {'fetched': ts} for archived pages)."""
+    if study == 'hayom_yom':
+        data.setdefault('hayom_yom', {})[key] = text
+        data.setdefault(RULES_SECTION, {})[key] = RULES_VERSION
+    else:
+        meta = meta or {}
+        entry = {'text': text, 'title': title, 'rules': RULES_VERSION,
+                 'hash': _text_hash(text), 'fetched': meta.get('fetched') or int(time.time())}
+        for k in ('etag', 'modified', 'method'):
+            if meta.get(k):
+                entry[k] = meta[k]
+        data.setdefault(study, {})[key] = entry
+
+def _text_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+def is_final(entry, day):
+    """Fetched on or after its own date: the site no longer changes it."""
+    fetched = entry.get('fetched') if isinstance(entry, dict) else None
+    return bool(fetched) and date.fromtimestamp(fetched) >= day
+
+def needs_refresh(entry, day, today=None):
+    """Stored entry to fetch again: within REFRESH_HORIZON days and not final."""
+    today = today or date.today()
+    return (isinstance(entry, dict) and 0 <= (day - today).days < REFRESH_HORIZON
+            and not is_final(entry, day))
+
+def _mark_checked(entry, day, meta=None):
+    """Content unchanged: the entry is only touched when this check makes it final,
+    so refreshing the near-term window does not rewrite the data file every night."""
+    if date.today() < day or is_final(entry, day):
+        return False
+    entry['hash'] = entry.get('hash') or _text_hash(entry.get('text', ''))
+    entry['fetched'] = int(time.time())
+    for k in ('etag', 'modified'):
+        if meta and meta.get(k):
+            entry[k] = meta[k]
+    return True
+
+def reclean_data(data):
+    """Re-clean, without fetching, the entries stored under older rules.
+    Entries that turn out to be garbage are kept as they are. Returns the count."""
+    versions = data.setdefault(RULES_SECTION, {})
+    n = 0
+    for key, text in data.get('hayom_yom', {}).items():
+        if versions.get(key, 0) < RULES_VERSION:
+            data['hayom_yom'][key] = strip_boilerplate(text)
+            versions[key] = RULES_VERSION
+            n += 1
+    for study in ('rambam', 'tanya', 'houmash'):
+        for key, entry in data.get(study, {}).items():
+            if entry.get('rules', 0) >= RULES_VERSION:
+                continue
+            cleaned, garbage = clean_and_classify(entry.get('text', ''))
+            if garbage:
+                print("  SKIP %s %s: garbage under rules v%d (%d chars)" % (study, key, RULES_VERSION, len(cleaned)))
+                continue
+            entry['text'], entry['rules'] = cleaned, RULES_VERSION
+            n += 1
+    print("Re-cleaned %d entries with rules v%d" % (n, RULES_VERSION))
+    return n
 
 def cleanup_old_entries(data, keep_days=30):
-    today = date.today()
-    for section in ['rambam','tanya','houmash']:
-        if section not in data: continue
-        to_remove = []
-        for key in data[section]:
-            try:
-                parts = key.split('-')
-                entry_date = date(int(parts[0]), int(parts[1]), int(parts[2]))
-                if (today - entry_date).days > keep_days: to_remove.append(key)
-            except: continue
-        for key in to_remove: del data[section][key]
-        if to_remove: print("Cleaned %d old from %s" % (len(to_remove), section))
+    """Drop the Rambam/Tanya/Houmash entries older than keep_days (date index of
+    the store, or the keys of data without one). Returns the count."""
+    from datetime import timedelta
+
+    cutoff = (date.today() - timedelta(days=keep_days)).isoformat()
+    store = _open_store()
+    if store:
+        store.sync(data)
+        removed = store.delete_before(cutoff)
+    else:
+        removed = []
+        for section in ('rambam', 'tanya', 'houmash'):
+            for key in data.get(section, {}):
+                try:
+                    if _date_key_iso(key) < cutoff:
+                        removed.append((section, key))
+                except ValueError:
+                    continue  # not a date key: kept, as before
+    for section, key in removed:
+        data[section].pop(key, None)
+    print("Cleaned %d entries before %s" % (len(removed), cutoff))
+    return len(removed)
+
+def _versions(values):
+    """'v3: 120, v2: 4' (v0: stored before extraction_rules.json)."""
+    counts = {}
+    for v in values:
+        counts[v] = counts.get(v, 0) + 1
+    return ', '.join("v%d: %d" % (v, n) for v, n in sorted(counts.items(), reverse=True)) or '-'
+
+def data_stats(data, days=30, today=None):
+    """Per section: entries, rules versions, garbage, final entries and the
+    days missing over the next `days` (what --days would fetch)."""
+    from datetime import timedelta
+
+    today = today or date.today()
+    upcoming = [today + timedelta(days=i) for i in range(days)]
+    print("=== %s (rules v%d) ===" % (_store.path if _store else DATA_FILE, RULES_VERSION))
+    hyy = data.get('hayom_yom', {})
+    keys = all_hyy_keys()
+    versions = data.get(RULES_SECTION, {})
+    print("  %-9s %d/%d keys, %d missing | rules %s" % (
+        'hayom_yom', len(keys & set(hyy)), len(keys), len(keys - set(hyy)), _versions(versions.get(k, 0) for k in hyy)))
+    for study in ('rambam', 'tanya', 'houmash'):
+        entries = data.get(study, {})
+        if not entries:
+            print("  %-9s 0 entries" % study)
+            continue
+        dates = sorted(_date_key_iso(k) for k in entries)
+        garbage = sum(1 for e in entries.values() if _is_garbage_text(_entry_text(e)))
+        final = sum(1 for k, e in entries.items() if is_final(e, date.fromisoformat(_date_key_iso(k))))
+        if _store:  # date index
+            missing = days - len(_store.days(study, upcoming[0].isoformat(), (today + timedelta(days=days)).isoformat()))
+        else:
+            missing = sum(1 for d in upcoming if "%d-%d-%d" % (d.year, d.month, d.day) not in entries)
+        print("  %-9s %d entries %s -> %s, %d garbage, %d final | next %d days: %d missing | rules %s" % (
+            study, len(entries), dates[0], dates[-1], garbage, final, days, missing,
+            _versions(e.get('rules', 0) if isinstance(e, dict) else 0 for e in entries.values())))
+
+
+# --- Crawl journal ---
+
+class CrawlJournal:
+    """Append-only JSONL log of every fetch: url, section/key, status, attempt,
+    method, latency and content hash. Successful lines also carry the stored
+    value, so entries scraped before a crash can be replayed into data.
+
+    With resume=True the existing journal is replayed: URLs whose page came
+    back empty or garbage JOURNAL_MAX_ATTEMPTS times in a row are not fetched
+    again. Challenges and errors are retried on every run.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = Path(path)
+        self.last = {}  # url -> last record
+        if resume:
+            self._replay()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, 'a', encoding='utf-8')
+        if self._f.tell() > 0:
+            self._f.write('\n')  # terminate a line cut by a crash, blank lines are skipped
+
+    def _replay(self):
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # line cut by a crash
+                self.last[rec['url']] = rec
+        done = sum(1 for r in self.last.values() if r['status'] in JOURNAL_DONE)
+        broken = sum(1 for url in self.last if not self.pending(url))
+        print("[journal] %s: %d URLs, %d done, %d broken" % (self.path, len(self.last), done, broken))
+
+    def attempts(self, url):
+        """Failed attempts in a row for this URL."""
+        rec = self.last.get(url)
+        return rec['attempt'] if rec and rec['status'] not in JOURNAL_DONE else 0
+
+    def broken(self, url):
+        """Empty/garbage pages in a row for this URL (challenges and errors in
+        between neither count nor reset it)."""
+        rec = self.last.get(url)
+        return rec.get('broken', 0) if rec and rec['status'] not in JOURNAL_DONE else 0
+
+    def pending(self, url):
+        """False once a URL is considered broken. Entries already in data are
+        skipped by the callers before asking."""
+        return self.broken(url) < JOURNAL_MAX_ATTEMPTS
+
+    def apply(self, data):
+        """Put values from successful journal lines back into data. Returns the count."""
+        n = 0
+        for rec in self.last.values():
+            if rec['status'] == 'ok' and 'value' in rec:
+                section = data.setdefault(rec['section'], {})
+                if rec['key'] not in section:
+                    section[rec['key']] = rec['value']
+                    n += 1
+        if n:
+            print("[journal] %d entries recovered" % n)
+        return n
+
+    def record(self, url, section, key, status, method='', ms=0, value=None, flush=True):
+        rec = {'url': url, 'section': section, 'key': key, 'status': status,
+               'attempt': self.attempts(url) + 1, 'method': method, 'ms': int(ms),
+               'ts': int(time.time())}
+        if status not in JOURNAL_DONE:
+            rec['broken'] = self.broken(url) + (status in JOURNAL_BROKEN)
+        METRICS.page(section, status, method)
+        if rec['attempt'] > 1:
+            METRICS.count('retry', section)
+        if value is not None:
+            text = _entry_text(value)
+            rec['hash'] = hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+            rec['value'] = value
+        self.last[url] = rec
+        self._f.write(json.dumps(rec, ensure_ascii=False) + '\n')
+        if flush:
+            self._f.flush()
+
+    def flush(self):
+        """After a batch of record(..., flush=False)."""
+        self._f.flush()
+
+    def close(self):
+        """Compact to one line per URL once data is saved, dropping the stored values."""
+        self._f.close()
+        tmp = self.path.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for rec in self.last.values():
+                rec = {k: v for k, v in rec.items() if k != 'value'}
+                f.write(json.dumps(rec, ensure_ascii=False) + '\n')
+        tmp.replace(self.path)
+
+
+def open_journal(mode, data):
+    """Journal for a bulk mode ('hyy', 'days', 'tanya'), one file per shard.
+    On --resume, entries recovered from it are put back into data."""
+    name = mode + ("-shard-%d-of-%d" % SHARD if SHARD else "") + ".jsonl"
+    journal = CrawlJournal(JOURNAL_DIR / name, resume=RESUME)
+    if RESUME:
+        journal.apply(data)
+    return journal
+
+
+# --- Raw HTML archive ---
+
+class HtmlArchive:
+    """Raw page HTML under ARCHIVE_DIR:
+      objects/<sha1[:2]>/<sha1>.html.gz  one file per distinct page, never rewritten
+      index.jsonl                        url, study, key, hash, ts - last line per (study, key) wins
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.index = self.root / 'index.jsonl'
+        self.stored = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.index, 'a', encoding='utf-8')
+        if self._f.tell() > 0:
+            self._f.write('\n')  # terminate a line cut by a crash, blank lines are skipped
+
+    def object_path(self, digest):
+        return self.root / 'objects' / digest[:2] / (digest + '.html.gz')
+
+    def put(self, url, study, key, html):
+        raw = html.encode('utf-8')
+        digest = hashlib.sha1(raw).hexdigest()
+        path = self.object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = _sibling(path, '.tmp')
+            tmp.write_bytes(gzip.compress(raw, compresslevel=6, mtime=0))
+            os.replace(tmp, path)
+            self.stored += 1
+        rec = {'url': url, 'study': study, 'key': key, 'hash': digest, 'ts': int(time.time())}
+        self._f.write(json.dumps(rec, ensure_ascii=False) + '\n')
+        self._f.flush()
+        return digest
+
+    def latest(self):
+        """{(study, key): index record} of the last page archived for each entry."""
+        out = {}
+        if not self.index.exists():
+            return out
+        with open(self.index, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                out[(rec['study'], rec['key'])] = rec
+        return out
+
+    def close(self):
+        self._f.close()
+        if self.stored:
+            print("[archive] %d new pages in %s" % (self.stored, self.root))
+
+
+_archive = None
+
+def archive_page(url, study, key, html):
+    """Keep the raw HTML of a fetched page when --archive is on."""
+    global _archive
+    if not ARCHIVE_DIR or not html:
+        return
+    if _archive is None:
+        _archive = HtmlArchive(ARCHIVE_DIR)
+    _archive.put(url, study, key, html)
+
+def close_archive():
+    global _archive
+    if _archive is not None:
+        _archive.close()
+        _archive = None
+
+def _data_key(study, target_date):
+    if study == 'hayom_yom':
+        return _hyy_key(greg_to_hebrew(target_date.year, target_date.month, target_date.day))
+    return "%d-%d-%d" % (target_date.year, target_date.month, target_date.day)
+
+def _reextract_one(job):
+    """Process pool worker: (study, key, gz path, parser) -> (study, key, text, title, garbage, timing)."""
+    study, key, path, parser = job
+    load_extractor().HTML_PARSER = parser  # spawned workers import the module afresh
+    with open(path, 'rb') as f:
+        html = gzip.decompress(f.read()).decode('utf-8')
+    timing = {}
+    text = extract_text_bs(html, keep_lines=True, study=study, timing=timing) or ''
+    title = _html_title(html)
+    if study == 'hayom_yom':
+        return study, key, text, title, len(text) <= 50, timing
+    cleaned, garbage = clean_and_classify(text)
+    return study, key, cleaned, title, garbage, timing
+
+def reextract_archive(root, workers=None):
+    """Rebuild the data file from the archived pages, no network.
+    Entries whose page re-extracts to garbage keep their stored text; the
+    others keep their other fields (HTTP validators, method)."""
+    parser = load_extractor().HTML_PARSER
+    archive = HtmlArchive(root)
+    latest = archive.latest()
+    archive.close()
+    jobs = []
+    for (study, key), rec in sorted(latest.items()):
+        path = archive.object_path(rec['hash'])
+        if path.exists():
+            jobs.append((study, key, str(path), parser))
+    fetched = {(study, key): rec['ts'] for (study, key), rec in latest.items()}
+    print("=== Re-extract: %d archived pages in %s ===" % (len(jobs), root))
+    if not jobs:
+        return
+    data = load_data()
+    t0 = time.monotonic()
+    updated = kept = 0
+    parse_ms, extract_ms = [], []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for study, key, text, title, garbage, timing in pool.map(_reextract_one, jobs, chunksize=16):
+            parse_ms.append(timing['parse_ms'])
+            extract_ms.append(timing['extract_ms'])
+            if garbage:
+                print("  x %s %s: garbage (%d chars), kept stored entry" % (study, key, len(text)))
+                kept += 1
+                continue
+            stored = data.get(study, {}).get(key)
+            _put_entry(data, study, key, text, title, {'fetched': fetched[(study, key)]})
+            if isinstance(stored, dict):
+                # new text, title, rules, hash; the validators (etag, modified) and
+                # method of the stored entry stay for the next conditional refresh
+                data[study][key] = dict(stored, **data[study][key])
+            updated += 1
+    print("Re-extracted %d entries (%d kept) in %.1fs" % (updated, kept, time.monotonic() - t0))
+    for name, values in (('parse', parse_ms), ('extract', extract_ms)):
+        values.sort()
+        print("  %-7s (%s): mean %.1f ms, p95 %.1f ms per page" % (
+            name, html_extract.HTML_PARSER, sum(values) / len(values), values[int(len(values) * 0.95)]))
+    save_data(data)
+
+
+# --- Sharding / merge ---
+
+def parse_shard(value):
+    """'2/4' -> (2, 4). Shards are numbered from 1."""
+    try:
+        i, n = (int(x) for x in value.split('/'))
+    except ValueError:
+        raise ValueError("expected i/N, got %r" % value)
+    if not 1 <= i <= n:
+        raise ValueError("shard %d out of 1..%d" % (i, n))
+    return i, n
+
+def in_shard(key):
+    """Stable key -> shard assignment: the same on every runner, whatever the work list order."""
+    if not SHARD:
+        return True
+    i, n = SHARD
+    return int(hashlib.sha1(key.encode('utf-8')).hexdigest()[:8], 16) % n == i - 1
+
+def _partial_file():
+    return PARTIAL_DIR / ("shard-%d-of-%d.json" % SHARD)
+
+def save_partial(data):
+    """Write the entries added or changed since load_data to this shard's partial file."""
+    partial = {}
+    for section, entries in data.items():
+        before = (_baseline or {}).get(section, {})
+        changed = {k: v for k, v in entries.items() if before.get(k) != v}
+        if changed:
+            partial[section] = changed
+    PARTIAL_DIR.mkdir(parents=True, exist_ok=True)
+    path = _partial_file()
+    _atomic_write(path, json.dumps(partial, ensure_ascii=False, indent=2))
+    print("\nSaved %d entries to %s" % (sum(len(v) for v in partial.values()), path))
+
+def _entry_text(value):
+    if isinstance(value, dict):
+        return value.get('text', '')
+    return value if isinstance(value, str) else ''
+
+def _prefer(new, old):
+    """Merge conflict rule: non-garbage beats garbage, then the latest fetch
+    (a refresh), then the longer text wins. Ties keep the existing entry.
+    Rules versions (RULES_SECTION): the newest wins."""
+    if isinstance(new, int) and isinstance(old, int):
+        return new > old
+    new_text, old_text = _entry_text(new), _entry_text(old)
+    new_bad, old_bad = _is_garbage_text(new_text), _is_garbage_text(old_text)
+    if new_bad != old_bad:
+        return old_bad
+    new_ts = new.get('fetched', 0) if isinstance(new, dict) else 0
+    old_ts = old.get('fetched', 0) if isinstance(old, dict) else 0
+    if new_ts != old_ts:
+        return new_ts > old_ts
+    return len(new_text) > len(old_text)
+
+def merge_partials(paths):
+    """Fold shard partial files into DATA_FILE. Files are applied in sorted order."""
+    data = load_data()
+    added = replaced = kept = 0
+    for path in sorted(Path(p) for p in paths):
+        with open(path, 'r', encoding='utf-8') as f:
+            partial = json.load(f)
+        print("Merging %s" % path)
+        for section, entries in partial.items():
+            target = data.setdefault(section, {})
+            for key, value in sorted(entries.items()):
+                if key not in target:
+                    target[key] = value; added += 1
+                elif target[key] == value:
+                    continue
+                elif _prefer(value, target[key]):
+                    target[key] = value; replaced += 1
+                else:
+                    kept += 1
+    save_data(data)
+    print("=== Merge: %d added, %d replaced, %d kept ===" % (added, replaced, kept))
 
 
 # --- Bulk Hayom Yom Scraper ---
 
-def bulk_scrape_hayom_yom():
-    """Scrape ALL Hayom Yom entries for the entire Hebrew year.
-    Iterates through 400 Gregorian days to cover all Hebrew dates.
+def plan_hayom_yom(existing, keys=None, around=None):
+    """Minimal fetch list for the missing Hayom Yom keys: [(date, hyy_key, heb)].
+    Starts from every valid key (Adar I/II included) and picks, for each
+    missing one, the Gregorian date closest to `around` on which it falls."""
+    wanted = set(keys) if keys else all_hyy_keys()
+    unknown = wanted - all_hyy_keys()
+    if unknown:
+        print("  [plan] unknown keys ignored: %s" % ', '.join(sorted(unknown)))
+    missing = wanted - unknown - set(existing)
+    dates = nearest_dates(missing, around or date.today())
+    plan = []
+    for hyy_key, d in dates.items():
+        plan.append((d, hyy_key, greg_to_hebrew(d.year, d.month, d.day)))
+    plan.sort()
+    return plan
+
+def bulk_scrape_hayom_yom(keys=None, dry_run=False):
+    """Scrape the missing Hayom Yom entries (all of them, or only `keys`).
     Stores entries by Hebrew date key (e.g., 'Adar_8') in hyy-data.json.
+    With dry_run, only prints the URLs that would be fetched.
     """
-    from datetime import timedelta
-
-    if not USE_PLAYWRIGHT:
+    if not USE_PLAYWRIGHT and not dry_run:
         print("Bulk scrape requires Playwright. Install: pip install playwright && playwright install chromium")
         sys.exit(1)
 
-    data = load_data()
+    data = load_data(read_only=dry_run)
     existing = set(data.get('hayom_yom', {}).keys())
     print("=== Bulk Hayom Yom Scrape ===")
     print("Existing entries: %d" % len(existing))
+    all_dates = plan_hayom_yom(existing, keys)
+    if SHARD:
+        all_dates = [x for x in all_dates if in_shard(x[1])]
+        print("Shard %d/%d" % SHARD)
+    if dry_run:
+        print("Plan: %d URLs" % len(all_dates))
+        for d, hyy_key, _heb in all_dates:
+            print("  %-14s %s" % (hyy_key, _study_url(PAGES['hayom_yom'], d)))
+        return
 
-    # Generate all dates for the next 400 days to cover a full Hebrew year
-    start = date.today()
-    all_dates = []
-    seen_keys = set(existing)
-
-    for i in range(400):
-        d = start + timedelta(days=i)
-        heb = greg_to_hebrew(d.year, d.month, d.day)
-        hyy_key = "%s_%d" % (heb['mName'].replace(' ', '_'), heb['hd'])
-        if hyy_key not in seen_keys:
-            all_dates.append((d, hyy_key, heb))
-            seen_keys.add(hyy_key)
-
+    journal = open_journal('hyy', data)
+    if RESUME:
+        all_dates = [x for x in all_dates if x[1] not in data.get('hayom_yom', {})]
+    pending = []
+    for d, hyy_key, heb in all_dates:
+        url = _study_url(PAGES['hayom_yom'], d)
+        if not journal.pending(url):
+            print("  [skip] %s: %d empty/garbage pages" % (hyy_key, journal.broken(url)))
+            continue
+        pending.append((d, hyy_key, heb))
+    all_dates = pending
     print("New entries to scrape: %d" % len(all_dates))
     if not all_dates:
         print("All entries already present!")
+        save_data(data)
+        journal.close()
         return
 
     scraped = 0
     failed = 0
+    deferred = []
+    _engines_state()
 
     with sync_playwright() as p:
         print("Launching Chromium...")
         browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            locale="fr-FR",
-        )
+        bstate = BrowserState(DEFAULT_UA)
+        context = browser.new_context(**bstate.context_options())
         page = context.new_page()
+        filt = ResourceFilter().install(page)
 
         # Warm-up Cloudflare
         print("Warm-up: solving Cloudflare...")
         try:
-            page.goto("https://fr.chabad.org/dailystudy/", wait_until="networkidle", timeout=90000)
-            if wait_for_cloudflare(page, max_wait=60):
+            if ensure_clearance(page, context, bstate, filt):
                 print("  Cloudflare resolved!")
-            time.sleep(3)
         except Exception as e:
             print("  Warm-up error: %s" % str(e))
-            time.sleep(3)
+        fetchers = _fetchers(context.cookies(), page.evaluate("() => navigator.userAgent"))
+        engines = [f.engine for f in fetchers if f.handles('hayom_yom')] + ['browser', 'slow']
 
         for idx, (target_date, hyy_key, heb) in enumerate(all_dates):
-            m, d, y = target_date.month, target_date.day, target_date.year
-            tdate = "%d/%d/%d" % (m, d, y)
-            url = "%s/hayomyom.asp?tdate=%s" % (BASE_URL, tdate)
+            url = _study_url(PAGES['hayom_yom'], target_date)
 
             print("[%d/%d] %s -> %s (%s %d)" % (idx+1, len(all_dates), target_date, hyy_key, heb['mName'], heb['hd']))
 
+            delay, via, result = DELAY, 'browser', None
+            t0 = time.monotonic()
             try:
-                page.goto(url, wait_until="networkidle", timeout=90000)
-                if not wait_for_cloudflare(page, max_wait=20):
-                    print("  x Cloudflare stuck")
-                    failed += 1
-                    time.sleep(DELAY)
+                for via in ENGINES.route('hayom_yom', engines):
+                    if via == 'slow':
+                        break
+                    if via != 'browser':
+                        result = next(f for f in fetchers if f.engine == via).fetch(url, 'hayom_yom')
+                        if result:
+                            delay = HTTP_DELAY
+                            archive_page(url, 'hayom_yom', hyy_key, result.get('html'))
+                            break
+                        continue
+                    ok, _ready, _ms = goto_ready_refresh(page, context, bstate, url, 'hayom_yom', filt)
+                    if not ok:
+                        ENGINES.record('hayom_yom', via, 'challenge', (time.monotonic() - t0) * 1000)
+                        continue
+                    if ARCHIVE_DIR:
+                        archive_page(url, 'hayom_yom', hyy_key, page.content())
+                    result = extract_page(page, 'hayom_yom')
+                    ENGINES.record('hayom_yom', via, 'ok' if len(result.get('text') or '') > 50 else 'empty',
+                                   (time.monotonic() - t0) * 1000)
+                    break
+                if result is None:
+                    print("  -> slow mode")
+                    deferred.append((target_date, 'hayom_yom', url, None, hyy_key))
                     continue
-
-                time.sleep(2)
-                result = page.evaluate(EXTRACT_JS)
                 text = result.get('text', '')
+                method = result.get('method', via)
+                ms = (time.monotonic() - t0) * 1000
 
                 if text and len(text) > 50:
-                    data.setdefault('hayom_yom', {})[hyy_key] = text
+                    _put_entry(data, 'hayom_yom', hyy_key, text)
+                    journal.record(url, 'hayom_yom', hyy_key, 'ok', method, ms, text)
                     scraped += 1
-                    print("  OK: %d chars" % len(text))
-
-                    # Save every 10 entries
-                    if scraped % 10 == 0:
-                        save_data(data)
-                        print("  [checkpoint saved: %d entries]" % len(data['hayom_yom']))
+                    print("  OK: %d chars [%s]" % (len(text), via))
                 else:
                     print("  x No content")
+                    journal.record(url, 'hayom_yom', hyy_key, 'empty', method, ms)
                     failed += 1
 
             except Exception as e:
                 print("  x Error: %s" % str(e))
+                if via == 'browser':
+                    ENGINES.record('hayom_yom', via, 'error', (time.monotonic() - t0) * 1000)
+                journal.record(url, 'hayom_yom', hyy_key, 'error', via, (time.monotonic() - t0) * 1000)
                 failed += 1
 
-            time.sleep(DELAY)
+            METRICS.sleep(delay, 'hayom_yom')
 
         browser.close()
 
+    ResourceFilter.report([filt])
+    for fetcher in fetchers:
+        fetcher.report()
+        fetcher.close()
+    if deferred:
+        print("\n=== Slow mode: %d pages ===" % len(deferred))
+        slow = slow_scrape(deferred, data, journal)
+        scraped += slow['scraped']
+        failed += slow['failed']
+    ENGINES.report()
+    _engines_state(save=True)
     save_data(data)
+    journal.close()
+    close_archive()
+    METRICS.summary()
     print("\n=== Bulk done: %d scraped, %d failed, %d total entries ===" % (scraped, failed, len(data.get('hayom_yom', {}))))
 
 
-# --- Bulk All Studies (multi-day) ---
+# --- Bulk All Studies (multi-day, concurrent) ---
 
-def bulk_scrape_all(days_ahead):
-    """Scrape all 4 studies for the next N days in a single Playwright session."""
-    from datetime import timedelta
+class RateLimiter:
+    """Global pacing + per-host concurrency cap for the async workers.
 
-    if not USE_PLAYWRIGHT:
-        print("Bulk scrape requires Playwright.")
-        sys.exit(1)
+    `backoff` grows when wait_for_cloudflare fails and decays on success,
+    so the whole pool slows down as soon as Cloudflare starts pushing back.
+    """
 
-    data = load_data()
-    start = date.today()
-    dates_to_scrape = [start + timedelta(days=i) for i in range(days_ahead)]
+    def __init__(self, rate=RATE_LIMIT, per_host=HOST_CONCURRENCY):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.per_host = per_host
+        self.backoff = 0.0
+        self._hosts = {}
+        self._lock = asyncio.Lock()
+        self._next = 0.0
+
+    def _host_sem(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.per_host)
+        return self._hosts[host]
+
+    async def _pace(self):
+        async with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval + self.backoff
+        if start > now:
+            await asyncio.sleep(start - now)
+            METRICS.observe(None, 'throttle', (start - now) * 1000)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, url):
+        async with self._host_sem(url):
+            await self._pace()
+            yield
+
+    def failure(self):
+        self.backoff = min(BACKOFF_MAX, max(2.0, self.backoff * 2))
+        print("    [backoff] %.0fs" % self.backoff)
+
+    def success(self):
+        self.backoff = self.backoff / 2 if self.backoff >= 1 else 0.0
+
+
+async def wait_for_cloudflare_async(page, max_wait=60):
+    """Async twin of wait_for_cloudflare."""
+    for _w in range(max_wait // 2):
+        if not _is_challenge_title(await page.title()):
+            return True
+        await asyncio.sleep(2)
+    return False
 
-    print("=== Bulk All Studies: %d days (%s -> %s) ===" % (
-        days_ahead, dates_to_scrape[0], dates_to_scrape[-1]))
 
-    total_scraped = 0
-    total_failed = 0
+async def warmup_async(page, max_wait=60, filt=None):
+    """Async twin of warmup."""
+    if filt:
+        filt.study = "warmup"
+    with METRICS.timer("warmup", 'goto'):
+        await page.goto(WARMUP_URL, wait_until="domcontentloaded", timeout=90000)
+    with METRICS.timer("warmup", 'cloudflare'):
+        ok = await wait_for_cloudflare_async(page, max_wait=max_wait)
+    if ok:
+        try:
+            await page.wait_for_load_state("load", timeout=15000)
+        except Exception:
+            pass
+    else:
+        METRICS.count('challenge', "warmup")
+    return ok
+
+
+async def ensure_clearance_async(page, context, bstate, filt=None, max_wait=60):
+    """Async twin of ensure_clearance."""
+    if bstate.restored:
+        print("  Cloudflare state restored, warm-up skipped")
+        return True
+    ok = await warmup_async(page, max_wait=max_wait, filt=filt)
+    if ok:
+        bstate.save(await context.storage_state())
+    return ok
 
-    with sync_playwright() as p:
-        print("Launching Chromium...")
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            locale="fr-FR",
-        )
-        page = context.new_page()
 
-        # Warm-up Cloudflare (once)
+async def wait_for_content_async(page, study, t0=None):
+    """Async twin of wait_for_content."""
+    t0 = t0 or time.monotonic()
+    with METRICS.timer(study, 'ready'):
+        try:
+            handle = await page.wait_for_function(READY_JS, arg=_ready_args(study),
+                                                  timeout=READY_TIMEOUT.get(study, 15000), polling=100)
+            ready = await handle.json_value()
+        except Exception:
+            ready = None
+    return ready, (time.monotonic() - t0) * 1000
+
+
+def _store_result(data, study, date_key, hyy_key, text, title, day=None, meta=None):
+    """Write one scraped study into data. Returns 'ok', 'garbage', or 'unchanged'
+    when a refreshed entry has the same text as before (see _mark_checked)."""
+    if study == 'hayom_yom':
+        return _store_clean(data, study, date_key, hyy_key, text, False, title)
+    cleaned, garbage = _clean(study, text)
+    return _store_clean(data, study, date_key, hyy_key, cleaned, garbage, title, day, meta)
+
+
+def _store_clean(data, study, date_key, hyy_key, cleaned, garbage, title, day=None, meta=None):
+    """_store_result for a text already cleaned and classified (pipeline writer)."""
+    if study == 'hayom_yom':
+        _put_entry(data, 'hayom_yom', hyy_key, cleaned)
+        return 'ok'
+    if garbage:
+        return 'garbage'
+    old = data.get(study, {}).get(date_key)
+    if isinstance(old, dict) and (old.get('hash') or _text_hash(old.get('text', ''))) == _text_hash(cleaned):
+        _mark_checked(old, day or date.today(), meta)
+        return 'unchanged'
+    _put_entry(data, study, date_key, cleaned, title, meta)
+    return 'ok'
+
+
+async def _browser_fetch_async(page, filt, url, study, limiter, tag):
+    """Navigate + extract in the browser. Returns {'text', 'title'} or None if stuck on Cloudflare."""
+    filt.study = study
+    async with limiter.slot(url):
+        print("  Fetching %s: %s" % (tag, url))
+        t0 = time.monotonic()
+        with METRICS.timer(study, 'goto'):
+            await page.goto(url, wait_until="domcontentloaded", timeout=90000)
+        with METRICS.timer(study, 'cloudflare'):
+            ok = await wait_for_cloudflare_async(page, max_wait=20)
+    if not ok:
+        METRICS.count('challenge', study)
+        limiter.failure()
+        return None
+    limiter.success()
+
+    ready, ms = await wait_for_content_async(page, study, t0)
+    print("    %s ready=%s in %dms" % (tag, ready or 'timeout', ms))
+    html = await page.content() if ARCHIVE_DIR else None
+    t1 = time.monotonic()
+    result = await page.evaluate(EXTRACT_JS, study)
+    _extract_timing(study, result, t1)
+    text = result.get('text', '')
+    title = _clean_title(await page.title()) if text and len(text) > 50 else ''
+    return {'text': text, 'title': title, 'method': result.get('method', ''), 'html': html}
+
+
+async def _browser_fetch_engine(page, filt, session, url, study, limiter, tag):
+    """_browser_fetch_async as the 'browser' engine: one more try after a fresh
+    warm-up when a restored clearance is refused, the outcome goes to ENGINES."""
+    context, bstate = session
+    t0 = time.monotonic()
+    result = await _browser_fetch_async(page, filt, url, study, limiter, tag)
+    if result is None and bstate.restored:
+        # Saved clearance no longer accepted: one worker warms up again, others just retry
+        print("  Challenge with a restored state, warming up again...")
+        METRICS.count('rewarm', study)
+        bstate.invalidate()
+        await ensure_clearance_async(page, context, bstate, filt)
+        result = await _browser_fetch_async(page, filt, url, study, limiter, tag)
+    outcome = 'challenge' if result is None else 'ok' if len(result['text'] or '') > 50 else 'empty'
+    ENGINES.record(study, 'browser', outcome, (time.monotonic() - t0) * 1000)
+    return result
+
+
+async def _http_fetch_async(fetcher, url, study, limiter, tag, validators=None):
+    async with limiter.slot(url):
+        print("  Fetching %s over HTTP: %s" % (tag, url))
+        return await asyncio.to_thread(fetcher.fetch, url, study, validators)
+
+
+def _postprocess(item):
+    """Pipeline worker (separate process): the CPU side of one page, no access to data.
+    (study, text, title) -> (cleaned text, garbage?, title, ms)."""
+    study, text, title = item
+    t0 = time.perf_counter()
+    if study == 'hayom_yom':
+        cleaned, garbage = text, False
+    else:
+        cleaned, garbage = clean_and_classify(text)
+    return cleaned, garbage, _clean_title(title or ''), (time.perf_counter() - t0) * 1000
+
+
+async def _fetch_worker(page, filt, fetchers, session, queue, fetched, done, limiter, data):
+    """Producer: navigates and extracts, then hands the page over and moves on.
+    Each page tries the engines ENGINES routes it to, cheapest first; pages no
+    fast engine could get are 'deferred' to the slow mode. Pages with text go
+    to `fetched` (bounded: waits only when post-processing falls PIPELINE_QUEUE
+    pages behind), the rest straight to the writer (`done`)."""
+    while True:
+        try:
+            job = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        target_date, study, url, date_key, hyy_key = job
+        tag = "%s %s" % (study, target_date)
+        key = hyy_key if study == 'hayom_yom' else date_key
+        stored = data.get(study, {}).get(key) if study != 'hayom_yom' else None
+        t0 = time.monotonic()
+        via = 'browser'
+        item = {'job': job, 'key': key, 'tag': tag, 'via': via}
+        try:
+            result = None
+            engines = [f.engine for f in fetchers if f.handles(study)] + ['browser', 'slow']
+            for via in ENGINES.route(study, engines):
+                if via == 'slow':
+                    break
+                if via == 'browser':
+                    result = await _browser_fetch_engine(page, filt, session, url, study, limiter, tag)
+                else:
+                    fetcher = next(f for f in fetchers if f.engine == via)
+                    result = await _http_fetch_async(fetcher, url, study, limiter, tag, stored)
+                if result:
+                    break
+            item.update(via=via, ms=(time.monotonic() - t0) * 1000)
+            if result is None:
+                print("    -> %s: slow mode" % tag)
+                item.update(status='deferred', method=via)
+                await done.put(item)
+                continue
+            if result.get('unchanged'):
+                item.update(status='not_modified', method=result['method'])
+                await done.put(item)
+                continue
+            archive_page(url, study, key, result.get('html'))
+            result.pop('html', None)
+            text = result['text']
+            item.update(method=result.get('method') or via, result=result)
+            if not (text and len(text) > 50):
+                item['status'] = 'empty'
+                await done.put(item)
+                continue
+            item['status'] = 'fetched'
+            item['queued'] = time.monotonic()
+            t1 = time.monotonic()
+            await fetched.put(item)
+            METRICS.observe(study, 'backpressure', (time.monotonic() - t1) * 1000)
+        except Exception as e:
+            if via == 'browser':
+                ENGINES.record(study, via, 'error', (time.monotonic() - t0) * 1000)
+            item.update(status='error', via=via, error=str(e), ms=(time.monotonic() - t0) * 1000)
+            await done.put(item)
+
+
+async def _post_worker(fetched, done, pool):
+    """Cleaning, classification and title normalization, off the event loop."""
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await fetched.get()
+        if item is None:
+            return
+        study = item['job'][1]
+        METRICS.observe(study, 'queued', (time.monotonic() - item['queued']) * 1000)
+        args = (study, item['result']['text'], item['result'].get('title'))
+        try:
+            if pool:
+                out = await loop.run_in_executor(pool, _postprocess, args)
+            else:
+                out = _postprocess(args)
+        except Exception as e:
+            item.update(status='error', error="post-processing: %s" % e)
+        else:
+            item['cleaned'], item['garbage'], item['title'], ms = out
+            if study != 'hayom_yom':
+                METRICS.observe(study, 'clean', ms)
+        await done.put(item)
+
+
+def _write_one(item, data, journal, stats):
+    target_date, study, url, date_key, hyy_key = item['job']
+    key, tag, status = item['key'], item['tag'], item['status']
+    ms, method = item.get('ms', 0), item.get('method') or item['via']
+    if status == 'not_modified':
+        _mark_checked(data[study][key], target_date)
+        print("    = %s: not modified" % tag)
+        journal.record(url, study, key, 'unchanged', method, ms, flush=False)
+        stats['unchanged'] += 1
+        return
+    if status == 'deferred':
+        stats['deferred'].append(item['job'])
+        return
+    if status in ('challenge', 'empty', 'error'):
+        print("    x %s: %s" % (tag, {'challenge': "Cloudflare stuck", 'empty': "no content"}.get(status) or item.get('error')))
+        journal.record(url, study, key, status, method, ms, flush=False)
+        stats['failed'] += 1
+        return
+    title = item['title']
+    stored = _store_clean(data, study, date_key, hyy_key, item['cleaned'], item['garbage'],
+                          title, target_date, item['result'])
+    if stored == 'garbage':
+        print("    x %s: garbage after cleaning" % tag)
+        journal.record(url, study, key, 'garbage', method, ms, flush=False)
+        stats['failed'] += 1
+    elif stored == 'unchanged':
+        print("    = %s: unchanged" % tag)
+        journal.record(url, study, key, 'unchanged', method, ms, flush=False)
+        stats['unchanged'] += 1
+    else:
+        journal.record(url, study, key, 'ok', method, ms, data[study][key], flush=False)
+        stats['scraped'] += 1
+        print("    OK %s: %d chars [%s] - %s" % (tag, len(item['result']['text']), item['via'], title[:50]))
+
+
+async def _store_writer(done, data, journal, stats):
+    """Single consumer: the only coroutine that touches data and the journal.
+    Applies what is waiting (up to WRITE_BATCH results), then flushes once."""
+    while True:
+        batch = [await done.get()]
+        while len(batch) < WRITE_BATCH and not done.empty():
+            batch.append(done.get_nowait())
+        for item in batch:
+            if item is not None:
+                _write_one(item, data, journal, stats)
+        journal.flush()
+        if None in batch:
+            return
+
+
+async def _bulk_scrape_all_async(data, jobs, concurrency, journal):
+    stats = {'scraped': 0, 'failed': 0, 'unchanged': 0, 'deferred': []}
+    limiter = RateLimiter()
+    queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+
+    async with async_playwright() as p:
+        print("Launching Chromium (%d pages)..." % concurrency)
+        browser = await p.chromium.launch(headless=True)
+        bstate = BrowserState(DEFAULT_UA)
+        context = await browser.new_context(**bstate.context_options())
+        page = await context.new_page()
+        filters = [await ResourceFilter().install_async(page)]
+
+        # Warm-up Cloudflare once, the clearance cookies are shared by every page of the context
         print("Warm-up: solving Cloudflare...")
         try:
-            page.goto("https://fr.chabad.org/dailystudy/", wait_until="networkidle", timeout=90000)
-            if wait_for_cloudflare(page, max_wait=60):
+            if await ensure_clearance_async(page, context, bstate, filters[0]):
                 print("  Cloudflare resolved!")
-            time.sleep(3)
         except Exception as e:
             print("  Warm-up error: %s" % str(e))
-            time.sleep(3)
-
-        for day_idx, target_date in enumerate(dates_to_scrape):
-            y, m, d = target_date.year, target_date.month, target_date.day
-            tdate = "%d/%d/%d" % (m, d, y)
-            date_key = "%d-%d-%d" % (y, m, d)
-            heb = greg_to_hebrew(y, m, d)
-            hyy_key = "%s_%d" % (heb['mName'].replace(' ', '_'), heb['hd'])
-
-            print("\n--- Day %d/%d: %s (heb: %s %d) ---" % (
-                day_idx+1, days_ahead, target_date, heb['mName'], heb['hd']))
+        fetchers = _fetchers(await context.cookies(), await page.evaluate("() => navigator.userAgent"))
+
+        pages = [page] + [await context.new_page() for _ in range(max(concurrency, 1) - 1)]
+        for pg in pages[1:]:
+            filters.append(await ResourceFilter().install_async(pg))
+
+        # fetch workers -> fetched -> post workers -> done -> writer
+        fetched = asyncio.Queue(maxsize=PIPELINE_QUEUE)
+        done = asyncio.Queue()
+        # spawn: forking a process that runs the Playwright driver threads is unsafe
+        pool = ProcessPoolExecutor(POST_WORKERS, mp_context=multiprocessing.get_context('spawn')) if POST_WORKERS else None
+        posts = [asyncio.create_task(_post_worker(fetched, done, pool)) for _ in range(max(POST_WORKERS, 1))]
+        writer = asyncio.create_task(_store_writer(done, data, journal, stats))
+        try:
+            await asyncio.gather(*(_fetch_worker(pg, f, fetchers, (context, bstate), queue, fetched, done, limiter, data)
+                                   for pg, f in zip(pages, filters)))
+            for _ in posts:
+                await fetched.put(None)
+            await asyncio.gather(*posts)
+            await done.put(None)
+            await writer
+        finally:
+            if pool:
+                pool.shutdown()
+        await browser.close()
+    ResourceFilter.report(filters)
+    for fetcher in fetchers:
+        fetcher.report()
+        fetcher.close()
+    return stats
+
+
+def plan_days(data, start, days_ahead, journal=None):
+    """Pages bulk_scrape_all fetches for the N days from `start`:
+    ([(date, study, url, date_key, hyy_key)], number of refreshes among them).
+    Without a journal, URLs given up on are listed too."""
+    from datetime import timedelta
 
-            for study, page_path in PAGES.items():
-                # Skip hayom_yom if already present (keyed by Hebrew date, repeats yearly)
-                if study == 'hayom_yom' and hyy_key in data.get('hayom_yom', {}):
+    jobs = []
+    queued_hyy = set()
+    refresh = 0
+    for target_date, heb in date_range(start, start + timedelta(days=days_ahead)):
+        y, m, d = target_date.year, target_date.month, target_date.day
+        date_key = "%d-%d-%d" % (y, m, d)
+        hyy_key = _hyy_key(heb)
+        for study, page_path in PAGES.items():
+            # Skip hayom_yom if already present (keyed by Hebrew date, repeats yearly)
+            if study == 'hayom_yom':
+                if hyy_key in data.get('hayom_yom', {}) or hyy_key in queued_hyy:
                     print("  [skip] %s: already have %s" % (study, hyy_key))
                     continue
-                # Skip other studies if already present for this date
-                if study != 'hayom_yom' and date_key in data.get(study, {}):
+                queued_hyy.add(hyy_key)
+            # Skip other studies if already present for this date, unless due for a refresh
+            elif date_key in data.get(study, {}):
+                if not needs_refresh(data[study][date_key], target_date):
                     print("  [skip] %s: already have %s" % (study, date_key))
                     continue
+                refresh += 1
+            if not in_shard("%s:%s" % (study, hyy_key if study == 'hayom_yom' else date_key)):
+                continue
+            url = _study_url(page_path, target_date)
+            if journal and not journal.pending(url):
+                print("  [skip] %s %s: %d empty/garbage pages" % (study, date_key, journal.broken(url)))
+                continue
+            jobs.append((target_date, study, url, date_key, hyy_key))
+    return jobs, refresh
 
-                sep = '&' if '?' in page_path else '?'
-                url = "%s/%s%stdate=%s" % (BASE_URL, page_path, sep, tdate)
-                print("  Fetching %s: %s" % (study, url))
-
-                try:
-                    page.goto(url, wait_until="networkidle", timeout=90000)
-                    if not wait_for_cloudflare(page, max_wait=20):
-                        print("    x Cloudflare stuck")
-                        total_failed += 1
-                        time.sleep(DELAY)
-                        continue
-
-                    time.sleep(2)
-                    result = page.evaluate(EXTRACT_JS)
-                    text = result.get('text', '')
-
-                    if text and len(text) > 50:
-                        title = page.title()
-                        clean_title = re.sub(r'\s*-\s*fr\.chabad\.org.*', '', title, flags=re.IGNORECASE).strip()
-
-                        if study == 'hayom_yom':
-                            data.setdefault('hayom_yom', {})[hyy_key] = text
-                        else:
-                            cleaned = _clean_scraped_text(text)
-                            if _is_garbage_text(cleaned):
-                                print("    x %s: garbage after cleaning" % study)
-                                total_failed += 1
-                                time.sleep(DELAY)
-                                continue
-                            data.setdefault(study, {})[date_key] = {'text': cleaned, 'title': clean_title}
-
-                        total_scraped += 1
-                        print("    OK: %d chars - %s" % (len(text), clean_title[:50]))
-                    else:
-                        print("    x No content")
-                        total_failed += 1
 
-                except Exception as e:
-                    print("    x Error: %s" % str(e))
-                    total_failed += 1
+def bulk_scrape_all(days_ahead, concurrency=CONCURRENCY):
+    """Scrape all 4 studies for the next N days, `concurrency` pages at a time
+    on a single warmed-up Playwright context."""
+    from datetime import timedelta
 
-                time.sleep(DELAY)
+    if not USE_PLAYWRIGHT:
+        print("Bulk scrape requires Playwright.")
+        sys.exit(1)
 
-            # Checkpoint every 3 days
-            if (day_idx + 1) % 3 == 0:
-                save_data(data)
-                print("  [checkpoint saved]")
+    data = load_data()
+    journal = open_journal('days', data)
+    start = date.today()
+    dates_to_scrape = [start + timedelta(days=i) for i in range(days_ahead)]
 
-        browser.close()
+    print("=== Bulk All Studies: %d days (%s -> %s), concurrency=%d ===" % (
+        days_ahead, dates_to_scrape[0], dates_to_scrape[-1], concurrency))
+
+    jobs, refresh = plan_days(data, start, days_ahead, journal)
+    if SHARD:
+        print("Shard %d/%d" % SHARD)
+    print("Pages to fetch: %d (%d refreshes)" % (len(jobs), refresh))
+    t0 = time.monotonic()
+    stats = {'scraped': 0, 'failed': 0, 'unchanged': 0, 'deferred': []}
+    if jobs:
+        _engines_state()
+        stats = asyncio.run(_bulk_scrape_all_async(data, jobs, concurrency, journal))
+    # Pages no fast engine could get: one context per page, paced (see bulk_scrape_tanya)
+    deferred = stats.pop('deferred')
+    if deferred:
+        print("\n=== Slow mode: %d pages ===" % len(deferred))
+        for k, n in slow_scrape(deferred, data, journal).items():
+            stats[k] += n
+    if jobs:
+        ENGINES.report()
+        _engines_state(save=True)
+        METRICS.summary()
 
     save_data(data)
+    journal.close()
+    close_archive()
     hyy_count = len(data.get('hayom_yom', {}))
     ram_count = len(data.get('rambam', {}))
     tan_count = len(data.get('tanya', {}))
     hou_count = len(data.get('houmash', {}))
-    print("\n=== Bulk done: %d scraped, %d failed ===" % (total_scraped, total_failed))
+    print("\n=== Bulk done: %d scraped, %d unchanged, %d failed in %.0fs ===" % (
+        stats['scraped'], stats['unchanged'], stats['failed'], time.monotonic() - t0))
     print("  hayom_yom: %d | rambam: %d | tanya: %d | houmash: %d" % (hyy_count, ram_count, tan_count, hou_count))
 
 
-# --- Bulk Tanya (slow, fresh context per request) ---
+# --- Slow mode (Tanya, and the pages no fast engine could get) ---
 
-TANYA_DELAY = 30  # seconds between requests
+# One headless Chromium for the run, a fresh context per page with the user agents
+# in turn (each UA warms up once, its clearance is reused by its next contexts).
+# Pacing: TokenBucket, slower after each challenge, faster again while pages get through.
+SLOW_RATE = 1 / 10      # pages/s at the start
+SLOW_RATE_MIN = 1 / 60  # floor after repeated challenges
+SLOW_RATE_MAX = 1 / 5
+SLOW_RATE_STEP = 0.01   # pages/s added after each page that got through
+SLOW_BURST = 1          # pages that may go without waiting
+SLOW_JITTER = 0.3       # random extra wait, fraction of the current interval
 TANYA_USER_AGENTS = [
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
@@ -710,165 +2188,361 @@ TANYA_USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0",
 ]
 
-def bulk_scrape_tanya(days_ahead):
-    """Scrape Tanya with a fresh browser context per request to avoid rate-limiting."""
-    from datetime import timedelta
-    import random
 
-    if not USE_PLAYWRIGHT:
-        print("Requires Playwright.")
-        sys.exit(1)
+class TokenBucket:
+    """Pacing for the slow mode: one token per page, refilled at `rate` tokens/s
+    up to `burst`. A challenge halves the rate and empties the bucket; each page
+    that gets through adds `step` back (AIMD), so the pace follows the
+    challenge rate the site shows instead of a fixed delay.
+    """
 
-    data = load_data()
-    start = date.today()
-    dates_to_scrape = []
+    def __init__(self, rate=SLOW_RATE, burst=SLOW_BURST, low=SLOW_RATE_MIN, high=SLOW_RATE_MAX,
+                 step=SLOW_RATE_STEP, jitter=SLOW_JITTER):
+        self.rate, self.burst, self.low, self.high, self.step, self.jitter = rate, burst, low, high, step, jitter
+        self.tokens = float(burst)
+        self.pages = self.challenges = 0
+        self._t = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._t) * self.rate)
+        self._t = now
+
+    def take(self, study=None):
+        """Wait for a token (plus jitter when waiting). Returns the seconds waited."""
+        self._refill()
+        wait = 0.0
+        if self.tokens < 1:
+            wait = (1 - self.tokens) / self.rate + random.uniform(0, self.jitter / self.rate)
+            print("  Waiting %ds..." % wait)
+            time.sleep(wait)
+            METRICS.observe(study, 'throttle', wait * 1000)
+            self._refill()
+        self.tokens = max(0.0, self.tokens - 1)
+        self.pages += 1
+        return wait
+
+    def challenge(self):
+        self.challenges += 1
+        self.rate = max(self.low, self.rate / 2)
+        self.tokens = 0.0
+        print("  [pace] challenge %d/%d, one page every %.0fs" % (self.challenges, self.pages, 1 / self.rate))
+
+    def success(self):
+        self.rate = min(self.high, self.rate + self.step)
+
+def plan_tanya(data, start, days_ahead, journal=None):
+    """Tanya dates bulk_scrape_tanya fetches for the N days from `start`."""
+    from datetime import timedelta
+
+    dates = []
     for i in range(days_ahead):
         d = start + timedelta(days=i)
         date_key = "%d-%d-%d" % (d.year, d.month, d.day)
-        if date_key not in data.get('tanya', {}):
-            dates_to_scrape.append(d)
-
-    print("=== Bulk Tanya (slow mode): %d to scrape ===" % len(dates_to_scrape))
-    if not dates_to_scrape:
-        print("All Tanya entries already present!")
-        return
-
-    scraped = 0
-    failed = 0
+        if date_key in data.get('tanya', {}) and not needs_refresh(data['tanya'][date_key], d):
+            continue
+        if not in_shard("tanya:%s" % date_key):
+            continue
+        url = _study_url(PAGES['tanya'], d)
+        if journal and not journal.pending(url):
+            print("  [skip] %s: %d empty/garbage pages" % (date_key, journal.broken(url)))
+            continue
+        dates.append(d)
+    return dates
+
+def slow_scrape(jobs, data, journal):
+    """Slow mode for [(date, study, url, date_key, hyy_key)]: a fresh context per
+    page (user agents in turn) on a single headless browser, paced by a
+    TokenBucket to avoid rate-limiting. Returns {'scraped', 'failed', 'unchanged'}."""
+    stats = {'scraped': 0, 'failed': 0, 'unchanged': 0}
+    filters = []
+    bucket = TokenBucket()
+    bstates = {}  # ua -> BrowserState, its clearance reused by the next contexts
 
     with sync_playwright() as p:
-        for idx, target_date in enumerate(dates_to_scrape):
-            m, d, y = target_date.month, target_date.day, target_date.year
-            tdate = "%d/%d/%d" % (m, d, y)
-            date_key = "%d-%d-%d" % (y, m, d)
+        print("Launching Chromium...")
+        browser = p.chromium.launch(headless=True)
+        for idx, (target_date, study, url, date_key, hyy_key) in enumerate(jobs):
+            key = hyy_key if study == 'hayom_yom' else date_key
             ua = TANYA_USER_AGENTS[idx % len(TANYA_USER_AGENTS)]
 
-            print("\n[%d/%d] Tanya %s" % (idx+1, len(dates_to_scrape), target_date))
+            print("\n[%d/%d] %s %s" % (idx+1, len(jobs), study, target_date))
+            bucket.take(study)
+            t0 = time.monotonic()
 
-            browser = p.chromium.launch(headless=False)
-            context = browser.new_context(user_agent=ua, locale="fr-FR")
+            if ua not in bstates:
+                bstates[ua] = BrowserState(ua)
+            bstate = bstates[ua]
+            bstate.reopen()
+            context = browser.new_context(**bstate.context_options())
             page = context.new_page()
+            filt = ResourceFilter().install(page)
+            filters.append(filt)
 
             try:
-                # Fresh warmup each time
-                print("  Warmup...")
-                page.goto("https://fr.chabad.org/dailystudy/", wait_until="networkidle", timeout=90000)
-                if not wait_for_cloudflare(page, max_wait=40):
+                # Warm-up once per UA, unless it has a saved clearance
+                if not bstate.restored:
+                    print("  Warmup...")
+                if not ensure_clearance(page, context, bstate, filt, max_wait=40):
                     print("  x Cloudflare stuck on warmup")
-                    browser.close()
-                    failed += 1
-                    time.sleep(TANYA_DELAY)
+                    journal.record(url, study, key, 'challenge', 'warmup', (time.monotonic() - t0) * 1000)
+                    ENGINES.record(study, 'slow', 'challenge', (time.monotonic() - t0) * 1000)
+                    context.close()
+                    bucket.challenge()
+                    stats['failed'] += 1
                     continue
-                time.sleep(3)
 
-                url = "%s/tanya.asp?tdate=%s" % (BASE_URL, tdate)
                 print("  Fetching: %s" % url)
-                page.goto(url, wait_until="networkidle", timeout=90000)
-                if not wait_for_cloudflare(page, max_wait=30):
+                # Attendre que le vrai contenu apparaisse (pas juste le formulaire Cloudflare)
+                ok, _ready, _ms = goto_ready_refresh(page, context, bstate, url, study, filt)
+                if not ok:
                     print("  x Cloudflare stuck")
-                    browser.close()
-                    failed += 1
-                    time.sleep(TANYA_DELAY)
+                    journal.record(url, study, key, 'challenge', 'slow', (time.monotonic() - t0) * 1000)
+                    ENGINES.record(study, 'slow', 'challenge', (time.monotonic() - t0) * 1000)
+                    context.close()
+                    bstate.invalidate()
+                    bucket.challenge()
+                    stats['failed'] += 1
                     continue
+                bucket.success()
 
-                # Attendre que le vrai contenu apparaisse (pas juste le formulaire Cloudflare)
-                print("  Waiting for content...")
-                content_selectors = ['#TextContent', '#textContent', '.article-text', '.page-text-content', '#contentArea', '#pageTextArea']
-                found_content = False
-                for _wait in range(15):
-                    for sel in content_selectors:
-                        try:
-                            el = page.query_selector(sel)
-                            if el:
-                                txt = el.inner_text().strip()
-                                if len(txt) > 100 and "Restez connect" not in txt:
-                                    found_content = True
-                                    print("  Content found via %s (%d chars)" % (sel, len(txt)))
-                                    break
-                        except:
-                            pass
-                    if found_content:
-                        break
-                    time.sleep(2)
-
-                if not found_content:
-                    # Dernier recours : attendre encore un peu
-                    time.sleep(5)
-
-                result = page.evaluate(EXTRACT_JS)
+                if ARCHIVE_DIR:
+                    archive_page(url, study, key, page.content())
+                result = extract_page(page, study)
                 text = result.get('text', '')
                 method = result.get('method', '')
+                ms = (time.monotonic() - t0) * 1000
+                ENGINES.record(study, 'slow', 'ok' if text and len(text) > 50 else 'empty', ms)
 
                 if text and len(text) > 50:
-                    title = page.title()
-                    clean_title = re.sub(r'\s*-\s*fr\.chabad\.org.*', '', title, flags=re.IGNORECASE).strip()
-                    cleaned = _clean_scraped_text(text)
+                    clean_title = _clean_title(page.title())
+                    status = _store_result(data, study, date_key, hyy_key, text, clean_title, target_date,
+                                           {'method': method})
 
-                    if _is_garbage_text(cleaned):
+                    if status == 'garbage':
+                        cleaned = clean_and_classify(text)[0]
                         print("  x Garbage (%d chars, method=%s)" % (len(cleaned), method))
                         print("    Preview: %s" % cleaned[:120])
-                        failed += 1
+                        journal.record(url, study, key, 'garbage', method, ms)
+                        stats['failed'] += 1
+                    elif status == 'unchanged':
+                        journal.record(url, study, key, 'unchanged', method, ms)
+                        stats['unchanged'] += 1
+                        print("  = Unchanged")
                     else:
-                        data.setdefault('tanya', {})[date_key] = {'text': cleaned, 'title': clean_title}
-                        scraped += 1
-                        print("  OK: %d chars - %s" % (len(cleaned), clean_title[:50]))
-
-                        if scraped % 5 == 0:
-                            save_data(data)
-                            print("  [checkpoint]")
+                        journal.record(url, study, key, 'ok', method, ms, data[study][key])
+                        stats['scraped'] += 1
+                        print("  OK: %d chars - %s" % (len(_entry_text(data[study][key])), clean_title[:50]))
                 else:
                     print("  x No content (method=%s)" % method)
-                    failed += 1
+                    journal.record(url, study, key, 'empty', method, ms)
+                    stats['failed'] += 1
 
             except Exception as e:
                 print("  x Error: %s" % str(e))
-                failed += 1
+                journal.record(url, study, key, 'error', 'slow', (time.monotonic() - t0) * 1000)
+                ENGINES.record(study, 'slow', 'error', (time.monotonic() - t0) * 1000)
+                stats['failed'] += 1
+
+            context.close()
+        browser.close()
+
+    ResourceFilter.report(filters)
+    print("[slow] %d pages, %d challenges" % (len(jobs), bucket.challenges))
+    return stats
+
+def bulk_scrape_tanya(days_ahead):
+    """Tanya for the next N days, straight in slow mode (slow_scrape)."""
+    if not USE_PLAYWRIGHT:
+        print("Requires Playwright.")
+        sys.exit(1)
+
+    data = load_data()
+    journal = open_journal('tanya', data)
+    dates_to_scrape = plan_tanya(data, date.today(), days_ahead, journal)
+
+    print("=== Bulk Tanya (slow mode): %d to scrape ===" % len(dates_to_scrape))
+    if not dates_to_scrape:
+        print("All Tanya entries already present!")
+        save_data(data)
+        journal.close()
+        return
 
-            browser.close()
-            if idx < len(dates_to_scrape) - 1:
-                wait = TANYA_DELAY + random.randint(0, 10)
-                print("  Waiting %ds..." % wait)
-                time.sleep(wait)
+    jobs = [(d, 'tanya', _study_url(PAGES['tanya'], d), "%d-%d-%d" % (d.year, d.month, d.day), None)
+            for d in dates_to_scrape]
+    _engines_state()
+    stats = slow_scrape(jobs, data, journal)
+    ENGINES.report()
+    _engines_state(save=True)
 
     save_data(data)
-    print("\n=== Tanya done: %d scraped, %d failed, %d total ===" % (
-        scraped, failed, len(data.get('tanya', {}))))
+    journal.close()
+    close_archive()
+    METRICS.summary()
+    print("\n=== Tanya done: %d scraped, %d unchanged, %d failed, %d total ===" % (
+        stats['scraped'], stats['unchanged'], stats['failed'], len(data.get('tanya', {}))))
 
 
 # --- Main ---
 
-def _parse_arg(flag):
-    """Return the value after --flag or None."""
-    for i, a in enumerate(sys.argv):
-        if a == flag and i + 1 < len(sys.argv):
-            return sys.argv[i + 1]
-    return None
+def write_metrics():
+    """Run report at exit (also after sys.exit or a crash, for partial nights)."""
+    try:
+        METRICS.write(METRICS_FILE, PROM_FILE)
+    except OSError as e:
+        print("[metrics] not written: %s" % e)
+
+def _shard_arg(value):
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def _keys_arg(value):
+    return [k.strip() for k in value.split(',') if k.strip()]
+
+def build_parser():
+    """Subcommands. Only `scrape` imports a browser engine, `reextract` only bs4."""
+    parser = argparse.ArgumentParser(prog='scrape_daily_studies.py',
+                                     description="Etudes quotidiennes de fr.chabad.org -> %s" % DATA_FILE)
+    sub = parser.add_subparsers(dest='command', metavar='COMMAND', required=True)
+
+    # What to fetch, shared by scrape and plan
+    work = argparse.ArgumentParser(add_help=False)
+    mode = work.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--hyy', action='store_true', help="missing Hayom Yom entries (whole year)")
+    mode.add_argument('--days', type=int, metavar='N', help="the 4 studies for the next N days")
+    mode.add_argument('--tanya', type=int, metavar='N', help="Tanya for the next N days (slow mode)")
+    work.add_argument('--keys', type=_keys_arg, metavar='K1,K2', help="with --hyy: only these keys")
+    work.add_argument('--refresh', type=int, default=REFRESH_HORIZON, metavar='N',
+                      help="fetch again the entries of the next N days until they are final")
+    work.add_argument('--shard', type=_shard_arg, metavar='i/N', help="deterministic slice of the work list")
+
+    p = sub.add_parser('scrape', parents=[work], help="fetch pages (Playwright or cloudscraper)")
+    p.add_argument('--concurrency', type=int, default=CONCURRENCY, metavar='N')
+    p.add_argument('--resume', action='store_true', help="replay the crawl journal")
+    p.add_argument('--no-block', action='store_true', help="load images, fonts and third-party scripts")
+    p.add_argument('--no-http', action='store_true', help="browser only, no hybrid HTTP fetches")
+    p.add_argument('--state', metavar='DIR', help="persistent Cloudflare state")
+    p.add_argument('--archive', metavar='DIR', help="keep the raw HTML of every page")
+    p.add_argument('--parser', choices=('lxml', 'html.parser'))
+    p.add_argument('--metrics', metavar='FILE', help="JSON run report")
+    p.add_argument('--prom', metavar='FILE', help="Prometheus textfile")
+
+    sub.add_parser('plan', parents=[work], help="print the URLs scrape would fetch, no network")
+
+    p = sub.add_parser('merge', help="fold shard partial files into %s" % DATA_FILE)
+    p.add_argument('files', nargs='*', metavar='FILE', help="default: %s/*.json" % PARTIAL_DIR)
+
+    p = sub.add_parser('reextract', help="rebuild the entries from an HTML archive, no network")
+    p.add_argument('--archive', metavar='DIR', required=True)
+    p.add_argument('--parser', choices=('lxml', 'html.parser'))
+
+    sub.add_parser('reclean', help="re-clean the entries stored under older rules")
+
+    p = sub.add_parser('stats', help="entries per study, freshness, days missing")
+    p.add_argument('--days', type=int, default=30, metavar='N', help="horizon for the missing days (30)")
+    p.add_argument('--metrics', metavar='FILE', help="also summarize a run report (scrape --metrics)")
+
+    p = sub.add_parser('prune', help="drop the dated entries older than N days")
+    p.add_argument('--keep-days', type=int, default=30, metavar='N')
+
+    sub.add_parser('export', help="write %s and %s/ from %s" % (DATA_FILE, DAILY_DIR, STORE_FILE))
+    return parser
+
+def show_plan(args):
+    """`plan`: the work list of `scrape` with the same options, journal left aside."""
+    if args.hyy:
+        bulk_scrape_hayom_yom(args.keys, dry_run=True)
+        return
+    data = load_data(read_only=True)
+    if args.days is not None:
+        jobs, refresh = plan_days(data, date.today(), args.days)
+        print("Plan: %d URLs (%d refreshes)" % (len(jobs), refresh))
+        for _d, study, url, date_key, hyy_key in jobs:
+            print("  %-9s %-14s %s" % (study, hyy_key if study == 'hayom_yom' else date_key, url))
+    else:
+        dates = plan_tanya(data, date.today(), args.tanya)
+        print("Plan: %d URLs" % len(dates))
+        for d in dates:
+            print("  %-9s %-14s %s" % ('tanya', "%d-%d-%d" % (d.year, d.month, d.day), _study_url(PAGES['tanya'], d)))
+
+def main(argv=None):
+    global BLOCK_RESOURCES, HYBRID_HTTP, STATE_DIR, SHARD, RESUME, ARCHIVE_DIR, METRICS_FILE, PROM_FILE, REFRESH_HORIZON
+    args = build_parser().parse_args(argv)
+    cmd = args.command
+
+    if cmd == 'export':
+        save_data(load_data())
+        return
 
-def main():
-    if '--bulk-hyy' in sys.argv:
-        bulk_scrape_hayom_yom()
+    if cmd == 'prune':
+        data = load_data()
+        cleanup_old_entries(data, args.keep_days)
+        save_data(data)
         return
 
-    tanya_arg = _parse_arg('--tanya')
-    if tanya_arg:
-        try:
-            days = int(tanya_arg)
-        except ValueError:
-            print("Invalid --tanya value: %s" % tanya_arg); sys.exit(1)
-        bulk_scrape_tanya(days)
+    if cmd == 'stats':
+        data_stats(load_data(read_only=True), args.days)
+        if args.metrics:
+            with open(args.metrics, 'r', encoding='utf-8') as f:
+                rep = json.load(f)
+            print("=== %s: %s, %s, %.0fs ===" % (args.metrics, rep.get('mode'), rep.get('started'), rep.get('duration_s', 0)))
+            print_summary(rep)
         return
 
-    days_arg = _parse_arg('--days')
-    if days_arg:
+    if cmd == 'reclean':
+        data = load_data()
+        reclean_data(data)
+        save_data(data)
+        return
+
+    if cmd == 'merge':
+        paths = args.files or sorted(str(p) for p in PARTIAL_DIR.glob('*.json'))
+        if not paths:
+            print("Nothing to merge in %s" % PARTIAL_DIR); sys.exit(1)
+        merge_partials(paths)
+        return
+
+    if cmd == 'reextract':
         try:
-            days = int(days_arg)
-        except ValueError:
-            print("Invalid --days value: %s" % days_arg); sys.exit(1)
-        bulk_scrape_all(days)
+            load_extractor()
+        except ImportError as e:
+            print("reextract needs beautifulsoup4: %s" % e); sys.exit(1)
+        if args.parser:
+            html_extract.HTML_PARSER = args.parser
+        reextract_archive(args.archive)
+        return
+
+    # scrape / plan
+    SHARD = args.shard
+    REFRESH_HORIZON = args.refresh
+    if cmd == 'plan':
+        show_plan(args)
         return
 
-    print("Usage: python scrape_daily_studies.py --bulk-hyy | --days N | --tanya N")
-    sys.exit(1)
+    BLOCK_RESOURCES = not args.no_block
+    HYBRID_HTTP = not args.no_http
+    RESUME = args.resume
+    STATE_DIR = args.state or STATE_DIR
+    ARCHIVE_DIR = args.archive or ARCHIVE_DIR
+    METRICS_FILE = args.metrics or METRICS_FILE
+    PROM_FILE = args.prom or PROM_FILE
+    if METRICS_FILE or PROM_FILE:
+        atexit.register(write_metrics)
+    load_engine()
+    if args.parser and html_extract:
+        html_extract.HTML_PARSER = args.parser
+
+    if args.hyy:
+        METRICS.mode = 'bulk-hyy'
+        bulk_scrape_hayom_yom(args.keys)
+    elif args.tanya is not None:
+        METRICS.mode = 'tanya'
+        bulk_scrape_tanya(args.tanya)
+    else:
+        METRICS.mode = 'days'
+        bulk_scrape_all(args.days, args.concurrency)
 
 if __name__ == '__main__':
     main()
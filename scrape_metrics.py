@@ -0,0 +1,183 @@
+"""
+Mesures d'un run du scraper: ou passe le temps (navigation, Cloudflare,
+attente du contenu, EXTRACT_JS, nettoyage, pauses), combien de pages ont
+abouti, les reprises, les methodes d'extraction et les octets recus.
+
+  METRICS.timer(study, 'goto')      -> duree d'une etape
+  METRICS.page(study, status, method)
+  METRICS.count('retry', study)     -> compteurs (retry, challenge, fallback...)
+  METRICS.add_bytes('browser', n)
+
+En fin de run, rapport JSON (--metrics FILE) et/ou fichier texte Prometheus
+(--prom FILE, pour le textfile collector de node_exporter), comparables d'une
+nuit a l'autre.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+REPORT_VERSION = 1
+PROM_PREFIX = "scrape"
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    return values[min(len(values), max(1, math.ceil(q * len(values)))) - 1]
+
+
+def _labels(**labels):
+    return ",".join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                    for k, v in labels.items())
+
+
+class RunMetrics:
+    """Thread-safe: HttpFetcher.fetch runs in worker threads (asyncio.to_thread)."""
+
+    def __init__(self):
+        self.mode = None
+        self.started = time.time()
+        self._t0 = time.monotonic()
+        self._lock = threading.Lock()
+        self.stages = {}    # (study, stage) -> [ms]
+        self.counters = {}  # (name, study) -> n
+        self.pages = {}     # (study, status) -> n
+        self.methods = {}   # (study, method) -> n, successful pages only
+        self.bytes = {}     # source -> bytes received
+
+    def observe(self, study, stage, ms):
+        with self._lock:
+            self.stages.setdefault((study or '-', stage), []).append(ms)
+
+    @contextmanager
+    def timer(self, study, stage):
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(study, stage, (time.monotonic() - t0) * 1000)
+
+    def sleep(self, seconds, study=None):
+        """time.sleep, counted as the 'sleep' stage (fixed politeness delays)."""
+        if seconds > 0:
+            time.sleep(seconds)
+            self.observe(study, 'sleep', seconds * 1000)
+
+    def count(self, name, study=None, n=1):
+        with self._lock:
+            key = (name, study or '-')
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def page(self, study, status, method=None):
+        with self._lock:
+            self.pages[(study, status)] = self.pages.get((study, status), 0) + 1
+            if status == 'ok':
+                key = (study, method or '?')
+                self.methods[key] = self.methods.get(key, 0) + 1
+
+    def add_bytes(self, source, n):
+        if n:
+            with self._lock:
+                self.bytes[source] = self.bytes.get(source, 0) + n
+
+    # --- Report ---
+
+    def report(self):
+        with self._lock:
+            studies = {}
+            for (study, stage), values in self.stages.items():
+                values = sorted(values)
+                studies.setdefault(study, {}).setdefault('stages', {})[stage] = {
+                    'count': len(values), 'sum_ms': round(sum(values), 1),
+                    'p50_ms': round(percentile(values, 0.5), 1), 'p95_ms': round(percentile(values, 0.95), 1)}
+            for (study, status), n in self.pages.items():
+                studies.setdefault(study, {}).setdefault('pages', {})[status] = n
+            for (study, method), n in self.methods.items():
+                studies.setdefault(study, {}).setdefault('methods', {})[method] = n
+            counters = {}
+            for (name, study), n in self.counters.items():
+                counters.setdefault(name, {})[study] = n
+            return {
+                'version': REPORT_VERSION,
+                'mode': self.mode,
+                'started': datetime.fromtimestamp(self.started, timezone.utc).isoformat(timespec='seconds'),
+                'duration_s': round(time.monotonic() - self._t0, 1),
+                'studies': studies,
+                'counters': counters,
+                'bytes': dict(self.bytes),
+            }
+
+    def prometheus(self):
+        """Text exposition format: one summary per stage, counters, bytes."""
+        rep = self.report()
+        p = PROM_PREFIX
+        lines = [
+            "# HELP %s_stage_seconds Time spent per scrape stage." % p,
+            "# TYPE %s_stage_seconds summary" % p,
+        ]
+        for study, st in sorted(rep['studies'].items()):
+            for stage, s in sorted(st.get('stages', {}).items()):
+                for q, key in (("0.5", 'p50_ms'), ("0.95", 'p95_ms')):
+                    lines.append('%s_stage_seconds{%s} %.4f' % (
+                        p, _labels(study=study, stage=stage, quantile=q), s[key] / 1000))
+                lines.append('%s_stage_seconds_sum{%s} %.4f' % (p, _labels(study=study, stage=stage), s['sum_ms'] / 1000))
+                lines.append('%s_stage_seconds_count{%s} %d' % (p, _labels(study=study, stage=stage), s['count']))
+        lines += ["# HELP %s_pages_total Pages by final status." % p, "# TYPE %s_pages_total counter" % p]
+        for study, st in sorted(rep['studies'].items()):
+            for status, n in sorted(st.get('pages', {}).items()):
+                lines.append('%s_pages_total{%s} %d' % (p, _labels(study=study, status=status), n))
+        lines += ["# HELP %s_extract_method_total Successful pages by extraction method." % p,
+                  "# TYPE %s_extract_method_total counter" % p]
+        for study, st in sorted(rep['studies'].items()):
+            for method, n in sorted(st.get('methods', {}).items()):
+                lines.append('%s_extract_method_total{%s} %d' % (p, _labels(study=study, method=method), n))
+        lines += ["# HELP %s_events_total Retries, challenges and fallbacks." % p, "# TYPE %s_events_total counter" % p]
+        for name, per_study in sorted(rep['counters'].items()):
+            for study, n in sorted(per_study.items()):
+                lines.append('%s_events_total{%s} %d' % (p, _labels(event=name, study=study), n))
+        lines += ["# HELP %s_bytes_total Bytes received." % p, "# TYPE %s_bytes_total counter" % p]
+        for source, n in sorted(rep['bytes'].items()):
+            lines.append('%s_bytes_total{%s} %d' % (p, _labels(source=source), n))
+        mode = _labels(mode=rep['mode'] or '-')
+        lines += ["# HELP %s_run_duration_seconds Duration of the run." % p, "# TYPE %s_run_duration_seconds gauge" % p,
+                  '%s_run_duration_seconds{%s} %.1f' % (p, mode, rep['duration_s']),
+                  "# HELP %s_run_timestamp_seconds Start of the run." % p, "# TYPE %s_run_timestamp_seconds gauge" % p,
+                  '%s_run_timestamp_seconds{%s} %d' % (p, mode, int(self.started))]
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path=None, prom_path=None):
+        """Write the JSON report and/or the Prometheus textfile (atomically:
+        the textfile collector may read at any time)."""
+        for path, text in ((json_path, lambda: json.dumps(self.report(), indent=1, sort_keys=True) + "\n"),
+                           (prom_path, self.prometheus)):
+            if not path:
+                continue
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = "%s.tmp" % path
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(text())
+            os.replace(tmp, path)
+            print("[metrics] %s" % path)
+
+    def summary(self):
+        print_summary(self.report())
+
+
+def print_summary(rep):
+    """One line per study of a report(): pages, p50/p95 of the main stages."""
+    for study, st in sorted(rep['studies'].items()):
+        pages = st.get('pages', {})
+        stages = " ".join("%s %d/%d" % (name, s['p50_ms'], s['p95_ms'])
+                          for name, s in sorted(st.get('stages', {}).items()) if name != 'sleep')
+        print("[metrics] %-9s ok %d/%d  p50/p95 ms: %s" % (
+            study, pages.get('ok', 0), sum(pages.values()), stages or '-'))
+
+
+METRICS = RunMetrics()
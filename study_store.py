@@ -0,0 +1,211 @@
+"""
+Stockage SQLite des etudes (sqlite3, bibliotheque standard).
+
+  entries    (study, day)  Rambam/Tanya/Houmash, day en ISO 'YYYY-MM-DD', index par date
+  hayom_yom  (key)         Hayom Yom par cle hebraique ('Adar_8')
+  meta       (name)        sha1 du dernier export JSON, ...
+
+Colonnes: text, title, hash (sha1 du texte), fetched, methode d'extraction,
+rules, validators HTTP (etag, modified). Les champs inconnus d'une entree sont
+gardes tels quels (extra, JSON). Hayom Yom: text, rules, hash, fetched.
+
+load() rend le dict de hyy-data.json, cles dans l'ordre d'insertion (rowid,
+garde par les mises a jour), comme le dict: l'export reprend l'ordre du fichier.
+sync(data) n'ecrit que les entrees changees depuis le dernier load/sync, en
+une transaction. Plages de dates, retention et merge passent par les index.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from datetime import date
+from pathlib import Path
+
+SCHEMA_VERSION = 1
+DATE_STUDIES = ('rambam', 'tanya', 'houmash')
+RULES_SECTION = "hayom_yom_rules"  # extraction_rules.json version of each Hayom Yom entry
+ENTRY_FIELDS = ('text', 'title', 'rules', 'hash', 'fetched', 'etag', 'modified', 'method')  # JSON key order
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    study TEXT NOT NULL, day TEXT NOT NULL,
+    text TEXT NOT NULL, title TEXT, rules INTEGER, hash TEXT, fetched INTEGER,
+    etag TEXT, modified TEXT, method TEXT, extra TEXT,
+    PRIMARY KEY (study, day));
+CREATE INDEX IF NOT EXISTS entries_day ON entries (day);
+CREATE TABLE IF NOT EXISTS hayom_yom (
+    key TEXT PRIMARY KEY,
+    text TEXT NOT NULL, rules INTEGER, hash TEXT, fetched INTEGER);
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def iso_day(date_key):
+    """'2026-3-5' -> '2026-03-05' (sorts and compares as a date)."""
+    y, m, d = (int(x) for x in date_key.split('-'))
+    return "%04d-%02d-%02d" % (y, m, d)
+
+
+def date_key(day):
+    """'2026-03-05' -> '2026-3-5', the keys of hyy-data.json."""
+    y, m, d = (int(x) for x in day.split('-'))
+    return "%d-%d-%d" % (y, m, d)
+
+
+def _is_date_key(key):
+    try:
+        date.fromisoformat(iso_day(key))
+    except (ValueError, AttributeError):
+        return False
+    return True
+
+
+def text_hash(text):
+    return hashlib.sha1((text or '').encode('utf-8')).hexdigest()[:16]
+
+
+def _entry_row(study, key, value):
+    value = value if isinstance(value, dict) else {'text': value}
+    extra = {k: v for k, v in value.items() if k not in ENTRY_FIELDS}
+    return (study, iso_day(key), value.get('text') or '', value.get('title'), value.get('rules'),
+            value.get('hash'), value.get('fetched'), value.get('etag'), value.get('modified'),
+            value.get('method'), json.dumps(extra, ensure_ascii=False, sort_keys=True) if extra else None)
+
+
+class StudyStore:
+
+    def __init__(self, path, read_only=False):
+        """read_only: an existing store, opened without creating or writing anything."""
+        self.path = str(path)
+        if read_only:
+            self.db = sqlite3.connect(Path(path).resolve().as_uri() + '?mode=ro', uri=True)
+        else:
+            self.db = sqlite3.connect(self.path)
+            self.db.executescript(_SCHEMA)
+            self.db.execute("INSERT OR IGNORE INTO meta VALUES ('schema', ?)", (str(SCHEMA_VERSION),))
+            self.db.commit()
+        self._seen = {}  # (section, key) -> value as of the last load/sync
+        self._bad = set()  # (section, key) not stored: the key is not a date, logged once
+
+    def close(self):
+        self.db.close()
+
+    def get_meta(self, name):
+        row = self.db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, name, value):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, value))
+
+    def count(self):
+        return sum(self.db.execute("SELECT (SELECT COUNT(*) FROM entries) + (SELECT COUNT(*) FROM hayom_yom)").fetchone())
+
+    # --- dict <-> tables ---
+
+    def _entry(self, row):
+        """entries row (text .. extra) -> dict of hyy-data.json, NULL fields left out."""
+        entry = {'text': row[0], 'title': row[1]}
+        for name, v in zip(ENTRY_FIELDS[2:], row[2:8]):
+            if v is not None:
+                entry[name] = v
+        if row[8]:
+            entry.update(json.loads(row[8]))
+        return entry
+
+    def load(self):
+        """The whole store as the hyy-data.json dict, keys in insertion order
+        (rowid: an updated entry keeps its place, as in the dict)."""
+        data = {'hayom_yom': {}}
+        rules = {}
+        for key, text, version in self.db.execute("SELECT key, text, rules FROM hayom_yom ORDER BY rowid"):
+            data['hayom_yom'][key] = text
+            if version is not None:
+                rules[key] = version
+        for study in DATE_STUDIES:
+            data[study] = {}
+        for row in self.db.execute("SELECT study, day, text, title, rules, hash, fetched, etag, modified, method, extra "
+                                   "FROM entries ORDER BY rowid"):
+            data.setdefault(row[0], {})[date_key(row[1])] = self._entry(row[2:])
+        if rules:
+            data[RULES_SECTION] = rules
+        self._seen = {(section, key): json.dumps(value, sort_keys=True)
+                      for section, entries in data.items() for key, value in entries.items()}
+        return data
+
+    def _upsert(self, section, key, value, versions):
+        if section == 'hayom_yom':
+            self.db.execute("INSERT INTO hayom_yom VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                            "text = excluded.text, rules = excluded.rules, hash = excluded.hash, fetched = excluded.fetched",
+                            (key, value, versions.get(key), text_hash(value), int(time.time())))
+        elif section == RULES_SECTION:
+            self.db.execute("UPDATE hayom_yom SET rules = ? WHERE key = ?", (value, key))
+        else:
+            # upsert, not INSERT OR REPLACE: the row keeps its rowid, so its place in the export
+            self.db.execute("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (study, day) DO UPDATE SET "
+                            "text = excluded.text, title = excluded.title, rules = excluded.rules, hash = excluded.hash, "
+                            "fetched = excluded.fetched, etag = excluded.etag, modified = excluded.modified, "
+                            "method = excluded.method, extra = excluded.extra",
+                            _entry_row(section, key, value))
+
+    def _delete(self, section, key):
+        if section == 'hayom_yom':
+            self.db.execute("DELETE FROM hayom_yom WHERE key = ?", (key,))
+        elif section == RULES_SECTION:
+            self.db.execute("UPDATE hayom_yom SET rules = NULL WHERE key = ?", (key,))
+        else:
+            self.db.execute("DELETE FROM entries WHERE study = ? AND day = ?", (section, iso_day(key)))
+
+    def sync(self, data, replace=False):
+        """Write the entries added, changed or removed since the last load/sync,
+        in one transaction. replace=True: the store becomes `data` (import of a
+        hyy-data.json). Dated entries whose key is not a date are skipped (and
+        logged), not stored. Returns (written, deleted)."""
+        current = {}
+        for section, entries in data.items():
+            if not isinstance(entries, dict):
+                continue
+            for key, value in entries.items():
+                if section not in ('hayom_yom', RULES_SECTION) and not _is_date_key(key):
+                    if (section, key) not in self._bad:
+                        self._bad.add((section, key))
+                        print("[store] %s: bad date key %r skipped" % (section, key))
+                    continue
+                current[(section, key)] = json.dumps(value, sort_keys=True)
+        seen = {} if replace else self._seen
+        changed = [k for k, v in current.items() if seen.get(k) != v]
+        removed = [k for k in seen if k not in current]
+        versions = data.get(RULES_SECTION, {})
+        # Hayom Yom rows before their rules version
+        changed.sort(key=lambda k: k[0] == RULES_SECTION)
+        with self.db:
+            if replace:
+                self.db.execute("DELETE FROM entries")
+                self.db.execute("DELETE FROM hayom_yom")
+            for section, key in removed:
+                self._delete(section, key)
+            for section, key in changed:
+                self._upsert(section, key, data[section][key], versions)
+        self._seen = current
+        return len(changed), len(removed)
+
+    # --- Indexed queries ---
+
+    def days(self, study, start, end):
+        """ISO days stored for `study` in [start, end) (ISO strings)."""
+        return [r[0] for r in self.db.execute(
+            "SELECT day FROM entries WHERE study = ? AND day >= ? AND day < ? ORDER BY day", (study, start, end))]
+
+    def delete_before(self, day, studies=DATE_STUDIES):
+        """Retention: drop the dated entries older than `day` (ISO). Returns
+        [(study, date_key)] removed."""
+        marks = ','.join('?' * len(studies))
+        with self.db:
+            old = self.db.execute("SELECT study, day FROM entries WHERE day < ? AND study IN (%s)" % marks,
+                                  (day,) + tuple(studies)).fetchall()
+            self.db.execute("DELETE FROM entries WHERE day < ? AND study IN (%s)" % marks, (day,) + tuple(studies))
+        removed = [(study, date_key(d)) for study, d in old]
+        for study, key in removed:
+            self._seen.pop((study, key), None)
+        return removed
@@ -18,7 +18,8 @@ var messaging = firebase.messaging();
 var KOULAM_URL = self.registration ? self.registration.scope : 'https://770lab.github.io/chabapp/';
 
 // ═══ PWA CACHE ═══
-var CACHE_NAME = 'koulam-v11';
+var CACHE_NAME = 'koulam-v12';
+var DIST_CACHE = 'koulam-dist';  // hashed dist/ files, pruned against data-manifest.json
 var ASSETS = [
   './',
   './index.html',
@@ -36,14 +37,47 @@ self.addEventListener('activate', function(e) {
   console.log('[SW v2] Activating');
   e.waitUntil(
     caches.keys().then(function(keys) {
-      return Promise.all(keys.filter(function(k) { return k !== CACHE_NAME; }).map(function(k) { return caches.delete(k); }));
+      return Promise.all(keys.filter(function(k) { return k !== CACHE_NAME && k !== DIST_CACHE; }).map(function(k) { return caches.delete(k); }));
     })
   );
   self.clients.claim();
 });
 
+// Drop the dist/ files of older builds: only the paths of the current manifest stay cached
+function pruneDist() {
+  return fetch('dist/data-manifest.json', { cache: 'no-cache' }).then(function(r) {
+    if (!r.ok) throw new Error('HTTP ' + r.status);
+    return r.json();
+  }).then(function(m) {
+    var files = m.files || {};
+    var keep = {};
+    Object.keys(files).forEach(function(name) { keep[new URL(files[name].path, self.location).href] = true; });
+    return caches.open(DIST_CACHE).then(function(c) {
+      return c.keys().then(function(reqs) {
+        return Promise.all(reqs.filter(function(req) { return !keep[req.url]; }).map(function(req) { return c.delete(req); }));
+      });
+    });
+  }).catch(function(err) { console.warn('[SW v2] dist prune:', err.message); });
+}
+
 self.addEventListener('fetch', function(e) {
   if (e.request.url.indexOf('workers.dev') !== -1) return;
+  // dist/ = content-hashed data files (build_data.py), immutable: cache first
+  if (e.request.url.indexOf('/dist/') !== -1 && e.request.url.indexOf('data-manifest.json') === -1) {
+    e.respondWith(
+      caches.match(e.request).then(function(hit) {
+        return hit || fetch(e.request).then(function(r) {
+          if (r.ok) {
+            var cl = r.clone();
+            // a new hashed file: the one it replaces can go
+            e.waitUntil(caches.open(DIST_CACHE).then(function(c) { return c.put(e.request, cl); }).then(pruneDist));
+          }
+          return r;
+        });
+      })
+    );
+    return;
+  }
   e.respondWith(
     fetch(e.request).then(function(r) {
       var cl = r.clone();
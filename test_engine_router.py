@@ -0,0 +1,57 @@
+import time
+import unittest
+
+import engine_router
+from engine_router import EngineRouter
+
+ENGINES = ['http', 'browser', 'slow']
+
+
+class RouteTest(unittest.TestCase):
+
+    def _open(self, router, study, engine):
+        for _ in range(engine_router.BREAKER_THRESHOLD):
+            router.record(study, engine, 'challenge')
+        self.assertEqual(router.breakers[(study, engine)].state, 'open')
+
+    def test_probe_not_claimed_when_cheaper_engine_succeeds(self):
+        router = EngineRouter()
+        self._open(router, 'hayom_yom', 'browser')
+        router.breakers[('hayom_yom', 'browser')].until = time.time() - 1  # cooldown over
+
+        # http serves the page: the browser is never tried, its test page stays free
+        for via in router.route('hayom_yom', ENGINES):
+            router.record('hayom_yom', via, 'ok')
+            break
+        self.assertEqual(via, 'http')
+        self.assertFalse(router.breakers[('hayom_yom', 'browser')].probing)
+
+        # http fails: the browser gets the test page
+        tried = []
+        for via in router.route('hayom_yom', ENGINES):
+            tried.append(via)
+            if via == 'http':
+                router.record('hayom_yom', via, 'challenge')
+                continue
+            router.record('hayom_yom', via, 'ok')
+            break
+        self.assertEqual(tried, ['http', 'browser'])
+        self.assertEqual(router.breakers[('hayom_yom', 'browser')].state, 'closed')
+
+    def test_half_open_gives_one_test_page(self):
+        router = EngineRouter()
+        self._open(router, 'rambam', 'http')
+        router.breakers[('rambam', 'http')].until = time.time() - 1
+        first = router.route('rambam', ENGINES)
+        self.assertEqual(next(first), 'http')  # claims the test page
+        self.assertEqual(list(router.route('rambam', ENGINES)), ['browser', 'slow'])
+
+    def test_fallback_kept_when_every_breaker_is_open(self):
+        router = EngineRouter()
+        for engine in ENGINES:
+            self._open(router, 'tanya', engine)
+        self.assertEqual(list(router.route('tanya', ENGINES)), ['slow'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import random
+import unittest
+from datetime import date
+
+from hebrew_calendar import all_hyy_keys, nearest_dates, year_keys, year_of
+
+
+def brute_nearest(keys, around, span=3):
+    """Every occurrence in the years hy - span .. hy + span: closest, ties to the future."""
+    target = around.toordinal()
+    hy = year_of(target)
+    found = {}
+    for y in range(hy - span, hy + span + 1):
+        for key, d in year_keys(y).items():
+            if key in keys:
+                found.setdefault(key, []).append(d)
+    return {key: min(ds, key=lambda d: (abs(d.toordinal() - target), -d.toordinal()))
+            for key, ds in found.items()}
+
+
+class NearestDatesTest(unittest.TestCase):
+
+    def test_adar_i_in_a_common_year(self):
+        # 5786 has no Adar I: 5787's (546 days ahead) beats 5784's (548 days back)
+        self.assertEqual(nearest_dates({'Adar_I_1'}, date(2025, 8, 11)), {'Adar_I_1': date(2027, 2, 8)})
+
+    def test_matches_brute_force(self):
+        rnd = random.Random(12)
+        keys = sorted(all_hyy_keys())
+        start = date(2000, 1, 1).toordinal()
+        for _ in range(300):
+            around = date.fromordinal(start + rnd.randrange(365 * 50))
+            wanted = set(rnd.sample(keys, 20)) | {'Adar_I_1', 'Adar_I_30', 'Kislev_30', 'Cheshvan_30'}
+            wanted &= set(keys)
+            self.assertEqual(nearest_dates(wanted, around), brute_nearest(wanted, around), around)
+
+    def test_ties_go_to_the_future(self):
+        # Halfway between two occurrences of a key: the later one wins
+        ties = 0
+        for key in ('Adar_I_1', 'Kislev_30', 'Cheshvan_30', 'Tishrei_1'):
+            days = sorted(d for y in range(5750, 5800) for k, d in year_keys(y).items() if k == key)
+            for before, after in zip(days, days[1:]):
+                gap = after.toordinal() - before.toordinal()
+                if gap % 2 == 0:
+                    around = date.fromordinal(before.toordinal() + gap // 2)
+                    self.assertEqual(nearest_dates({key}, around), {key: after}, around)
+                    ties += 1
+        self.assertTrue(ties)
+
+if __name__ == '__main__':
+    unittest.main()
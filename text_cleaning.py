@@ -0,0 +1,153 @@
+"""
+Nettoyage des textes scrapes sur fr.chabad.org (en-tete, pieds de page, formulaires).
+
+clean_and_classify(raw) -> (texte nettoye, garbage?)
+
+Les marqueurs, selecteurs et seuils viennent de extraction_rules.json, charge
+aussi par EXTRACT_JS (genere a partir du fichier) et extract_text_bs. Son
+numero de version est enregistre avec chaque entree.
+
+Une seule recherche compilee, ancree sur '\n', donne le point de coupe du
+premier pied de page. Le classement "garbage" ne regarde que la partie gardee:
+les textes longs ne sont testes que pour deux marqueurs, les courts (< 300
+caracteres) pour tous. L'en-tete (ancre en debut de texte) et les marqueurs de
+fin (cherches dans les ~200 derniers caracteres) ne parcourent pas le texte.
+bench_clean.py compare avec l'ancienne chaine de re.sub.
+"""
+
+import json
+import re
+from pathlib import Path
+
+RULES_FILE = Path(__file__).resolve().parent / "extraction_rules.json"
+
+
+def load_rules(path=RULES_FILE):
+    """Regles d'extraction partagees par EXTRACT_JS, extract_text_bs et le nettoyage."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+RULES = load_rules()
+RULES_VERSION = RULES['version']  # stored with each entry, older entries can be re-cleaned
+
+# 'Calendrier juif ... Aujourd'hui\n' en tete des pages Rambam/Tanya/Houmash
+HEADER_RE = re.compile(RULES['clean']['header'])
+
+# Tout ce qui suit le premier de ces marqueurs (en debut de ligne) est coupe
+FOOTER_RE = re.compile(r'\n(?:%s)' % '|'.join(RULES['clean']['footers']))
+
+# (marqueur, fenetre): coupe si le marqueur est a moins de `fenetre` caracteres
+# de la fin. Appliques dans l'ordre, chacun sur le texte deja raccourci.
+# tail_ignore_case vaut aussi pour EXTRACT_JS (flag 'i').
+TAIL_FLAGS = re.IGNORECASE if RULES['clean'].get('tail_ignore_case') else 0
+TAIL_MARKERS = [(re.compile(re.escape(m), TAIL_FLAGS), len(m), w) for m, w in RULES['clean']['tail']]
+
+_G = RULES['garbage']
+ALWAYS_GARBAGE = tuple(_G['always'])          # whatever the length
+SHORT_GARBAGE = tuple(_G['short'])            # < short_len chars
+FOOTER_MARKERS = tuple(_G['footer_markers'])  # footer_min_hits+ and < short_len chars
+SHORT_LEN = _G['short_len']
+MIN_LEN = _G['min_len']
+
+HEBREW_RE = re.compile(RULES['chars']['hebrew'])
+LATIN_RE = re.compile(RULES['chars']['latin'])
+NAV_RE = re.compile(RULES['nav'], re.IGNORECASE)
+
+
+def _cut_tail(text, end):
+    """Apply TAIL_MARKERS to text[:end]. Returns (new end, keep a trailing '\\n')."""
+    newline = False
+    for marker, n, window in TAIL_MARKERS:
+        # Same match as re.sub(marker + r'[\s\S]{0,window}$'): '$' also matches before a final '\n'
+        size = end + newline
+        ends_nl = newline or (end > 0 and text[end - 1] == '\n')
+        m = marker.search(text, max(0, size - n - window - ends_nl), end)
+        if not m:
+            continue
+        newline = size - m.end() > window  # the final '\n' was left out of the match
+        end = m.start()
+    return end, newline
+
+
+def _classify(text):
+    """Garbage rules on the cleaned text. Long texts only need ALWAYS_GARBAGE."""
+    n = len(text)
+    if n < MIN_LEN:
+        return True
+    if any(m in text for m in ALWAYS_GARBAGE):
+        return True
+    if n < SHORT_LEN:
+        if any(m in text for m in SHORT_GARBAGE):
+            return True
+        if sum(1 for m in FOOTER_MARKERS if m in text) >= _G['footer_min_hits']:
+            return True
+    return False
+
+
+def clean_and_classify(text):
+    """(cleaned text, is_garbage): one footer search, then the rules on what is kept."""
+    if not text:
+        return text, True
+    m = HEADER_RE.match(text)
+    if m:
+        text = text[m.end():]
+    m = FOOTER_RE.search(text)
+    end, newline = _cut_tail(text, m.start() if m else len(text))
+    cleaned = (text[:end] + ('\n' if newline else '')).strip()
+    return cleaned, _classify(cleaned)
+
+
+def clean_scraped_text(text):
+    """Strip known fr.chabad.org boilerplate from scraped text."""
+    if not text:
+        return text
+    return clean_and_classify(text)[0]
+
+
+def is_garbage_text(text):
+    """Detect garbage text (subscription forms, publisher info, etc)."""
+    if not text:
+        return True
+    return _classify(text)
+
+
+def strip_boilerplate(text):
+    """Only the end markers (stripBoilerplate of EXTRACT_JS)."""
+    if not text:
+        return text
+    end, newline = _cut_tail(text, len(text))
+    return (text[:end] + ('\n' if newline else '')).strip()
+
+
+def hebrew_ratio(text):
+    return len(HEBREW_RE.findall(text)) / len(text) if text else 0
+
+
+def latin_ratio(text):
+    return len(LATIN_RE.findall(text)) / len(text) if text else 0
+
+
+def is_nav_text(text):
+    return bool(NAV_RE.search(text))
+
+
+def is_boilerplate(text):
+    """Mostly boilerplate: several markers in a short text."""
+    b = RULES['boilerplate']
+    return len(text) < b['max_len'] and sum(1 for m in b['markers'] if m in text) >= b['min_hits']
+
+
+def accepts(tier, text):
+    """Text found by a selector of `tier` (RULES['tiers']) is the content."""
+    if len(text) <= tier['min_len'] or is_nav_text(text) or is_boilerplate(text):
+        return False
+    if 'hebrew_min' in tier and hebrew_ratio(text) > tier['hebrew_min']:
+        return True
+    return latin_ratio(text) > tier['latin_min']
+
+
+def study_tiers(study, table=None):
+    """[(name, tier)] tried in order for a study."""
+    table = table or RULES['studies']
+    return [(name, RULES['tiers'][name]) for name in table.get(study) or table['default']]